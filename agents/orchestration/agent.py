@@ -78,6 +78,9 @@ class OrchestrationAgent:
         # Initialisation du graphe LangGraph
         self._setup_langgraph()
         
+        # Agent de synthèse créé au premier usage puis réutilisé
+        self._synthesis_agent = None
+        
         # Métriques et monitoring
         self.active_workflows: Dict[str, WorkflowState] = {}
         self.workflow_metrics: Dict[str, Dict[str, Any]] = {}
@@ -573,14 +576,22 @@ class OrchestrationAgent:
         state.current_step = "synthesis"
         return state
     
+    def _get_synthesis_agent(self):
+        """Retourne l'agent de synthèse partagé, créé au premier appel.
+        
+        Le partage est sûr car SynthesisAgent ne conserve aucun état par
+        requête (citations comprises) entre deux appels.
+        """
+        if self._synthesis_agent is None:
+            # Import dynamique pour éviter les imports circulaires
+            from agents.synthesis.agent import SynthesisAgent
+            self._synthesis_agent = SynthesisAgent()
+        return self._synthesis_agent
+    
     async def _synthesis_node(self, state: WorkflowState) -> WorkflowState:
         """Nœud de synthèse utilisant l'agent de synthèse avec providers configurés."""
         try:
-            # Importer l'agent de synthèse dynamiquement pour éviter les imports circulaires
-            from agents.synthesis.agent import SynthesisAgent
-            
-            # Créer une instance de l'agent de synthèse
-            synthesis_agent = SynthesisAgent()
+            synthesis_agent = self._get_synthesis_agent()
             
             # Préparer la requête pour l'agent de synthèse
             from core.models import QueryRequest, ChatMessage
@@ -4,16 +4,27 @@ Handles vector database operations and metadata management.
 """
 
 import asyncio
+import json
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional, Set, TypeVar, Union
+from urllib.parse import urlparse
 from uuid import UUID
 
+import httpx
 import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 import weaviate
+from weaviate.auth import AuthApiKey
+from weaviate.classes.config import Configure, DataType, Property
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter, MetadataQuery
 
 from core.config import settings
 from core.exceptions import VectorDBError, ErrorCodes
@@ -22,6 +33,82 @@ from core.models import DocumentChunk, SearchQuery, SearchResult
 from database.models import DocumentChunk as DBDocumentChunk
 
 
+Vector = Union[np.ndarray, List[float]]
+T = TypeVar("T")
+
+# Dedicated pool for the blocking vector DB clients, so a slow search does
+# not stall the event loop (and is not starved by the default executor)
+_IO_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="vdb")
+
+
+async def _run(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking vector DB call on the shared I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_POOL, partial(fn, *args, **kwargs))
+
+
+def _as_float32(vector: Vector) -> np.ndarray:
+    """Return the vector as a float32 ndarray, without copying when possible."""
+    return np.asarray(vector, dtype=np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or the rows of a matrix; zero vectors are kept."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+@lru_cache()
+def get_qdrant_client() -> QdrantClient:
+    """Get the process-wide Qdrant client.
+    
+    gRPC multiplexes concurrent requests over one HTTP/2 channel; the REST
+    fallback keeps a pooled keep-alive transport. Sharing the client lets
+    every agent in a worker reuse the same connections.
+    """
+    return QdrantClient(
+        host=settings.vector_db.qdrant_host,
+        port=settings.vector_db.qdrant_port,
+        grpc_port=settings.vector_db.qdrant_grpc_port,
+        prefer_grpc=settings.vector_db.qdrant_prefer_grpc,
+        api_key=settings.vector_db.qdrant_api_key,
+        timeout=settings.vector_db.qdrant_timeout,
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=settings.vector_db.qdrant_max_keepalive_connections,
+            max_connections=settings.vector_db.qdrant_max_connections
+        )
+    )
+
+
+def _filter_key(filters: Dict[str, Any]) -> str:
+    """Turn a filter dict into a hashable, order-independent key.
+    
+    Values that are not JSON types (e.g. UUIDs) are keyed by their string form.
+    """
+    return json.dumps(filters, sort_keys=True, default=str)
+
+
+@lru_cache(maxsize=512)
+def _build_qdrant_filter(filter_key: str) -> models.Filter:
+    """Build and validate the Qdrant filter for a filter key."""
+    conditions = []
+    for key, value in json.loads(filter_key).items():
+        if isinstance(value, list):
+            match = models.MatchAny(any=value)
+        else:
+            match = models.MatchValue(value=value)
+        conditions.append(models.FieldCondition(key=key, match=match))
+    
+    return models.Filter(must=conditions)
+
+
+def _qdrant_filter(filters: Dict[str, Any]) -> models.Filter:
+    """Get the (cached) Qdrant filter for a filter dict."""
+    return _build_qdrant_filter(_filter_key(filters))
+
+
 class VectorDatabase(ABC):
     """Abstract base class for vector databases."""
     
@@ -43,7 +130,7 @@ class VectorDatabase(ABC):
     async def search_vectors(
         self,
         collection_name: str,
-        query_vector: List[float],
+        query_vector: Vector,
         limit: int = 10,
         filters: Optional[Dict[str, Any]] = None,
         threshold: float = 0.7
@@ -73,36 +160,86 @@ class VectorDatabase(ABC):
     async def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
         """Get collection information."""
         pass
+    
+    async def close(self) -> None:
+        """Release the backend's connections."""
+        pass
 
 
 class QdrantDatabase(VectorDatabase):
     """Qdrant vector database implementation."""
     
+    # Payload fields that search filters are pushed down on
+    PAYLOAD_INDEXES = {
+        "document_id": models.PayloadSchemaType.KEYWORD,
+        "chunk_index": models.PayloadSchemaType.INTEGER,
+        "metadata.language": models.PayloadSchemaType.KEYWORD,
+        "metadata.embedding_model": models.PayloadSchemaType.KEYWORD,
+    }
+    
+    # Only the payload fields SearchResult is hydrated from
+    SEARCH_PAYLOAD = models.PayloadSelectorInclude(
+        include=["document_id", "content", "metadata"]
+    )
+    
     def __init__(self):
-        self.client = QdrantClient(
-            host=settings.vector_db.qdrant_host,
-            port=settings.vector_db.qdrant_port,
-            api_key=settings.vector_db.qdrant_api_key
+        self.client = get_qdrant_client()
+        self.normalize = settings.vector_db.normalize_embeddings
+        self.quantize = settings.vector_db.qdrant_quantization
+        # Search the int8 index, then rescore an oversampled candidate set
+        # against the original vectors; ignored by unquantized collections
+        self.search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=settings.vector_db.qdrant_quantization_oversampling
+            )
         )
     
+    def _prepare_vectors(self, vectors: Vector) -> np.ndarray:
+        """Convert to float32, unit-normalizing when the collection uses DOT."""
+        vectors = _as_float32(vectors)
+        return _normalize(vectors) if self.normalize else vectors
+    
     async def create_collection(self, collection_name: str, dimension: int) -> bool:
         """Create a new Qdrant collection."""
         try:
-            # Check if collection exists
-            try:
-                self.client.get_collection(collection_name)
-                return True  # Collection already exists
-            except:
-                pass
+            if await _run(self.client.collection_exists, collection_name):
+                return True
             
             # Create collection
-            self.client.create_collection(
+            await _run(
+                self.client.create_collection,
                 collection_name=collection_name,
                 vectors_config=VectorParams(
                     size=dimension,
-                    distance=Distance.COSINE
+                    # Pre-normalized vectors rank identically under DOT
+                    distance=Distance.DOT if self.normalize else Distance.COSINE,
+                    on_disk=self.quantize
+                ),
+                quantization_config=models.ScalarQuantization(
+                    scalar=models.ScalarQuantizationConfig(
+                        type=models.ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
+                ) if self.quantize else None,
+                # payload_m builds per-value HNSW links so filtered
+                # searches stay on the graph instead of post-filtering
+                hnsw_config=models.HnswConfigDiff(
+                    m=16,
+                    ef_construct=128,
+                    payload_m=16
                 )
             )
+            
+            # Index filterable payload fields so the planner can pre-filter
+            for field_name, field_schema in self.PAYLOAD_INDEXES.items():
+                await _run(
+                    self.client.create_payload_index,
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
             return True
             
         except Exception as e:
@@ -118,30 +255,43 @@ class QdrantDatabase(VectorDatabase):
     ) -> bool:
         """Insert vectors into Qdrant collection."""
         try:
-            points = []
-            for chunk in chunks:
-                if not chunk.embedding:
-                    continue
-                
-                point = models.PointStruct(
-                    id=str(chunk.id),
-                    vector=chunk.embedding,
-                    payload={
-                        "document_id": str(chunk.document_id),
+            embedded = [chunk for chunk in chunks if chunk.embedding is not None]
+            
+            if embedded:
+                # Stack into a single float32 matrix; ndarray rows are copied
+                # without ever materializing Python float objects
+                vectors = self._prepare_vectors(
+                    [chunk.embedding for chunk in embedded]
+                )
+                # Chunks of one document share ids and usually timestamps;
+                # format each distinct value once
+                document_ids = {
+                    document_id: str(document_id)
+                    for document_id in {chunk.document_id for chunk in embedded}
+                }
+                timestamps = {
+                    created_at: created_at.isoformat()
+                    for created_at in {chunk.created_at for chunk in embedded}
+                }
+                payloads = [
+                    {
+                        "document_id": document_ids[chunk.document_id],
                         "content": chunk.content,
                         "chunk_index": chunk.chunk_index,
                         "start_char": chunk.start_char,
                         "end_char": chunk.end_char,
                         "metadata": chunk.metadata,
-                        "created_at": chunk.created_at.isoformat(),
+                        "created_at": timestamps[chunk.created_at],
                     }
-                )
-                points.append(point)
-            
-            if points:
-                self.client.upsert(
+                    for chunk in embedded
+                ]
+                await _run(
+                    self.client.upload_collection,
                     collection_name=collection_name,
-                    points=points
+                    vectors=vectors,
+                    payload=payloads,
+                    ids=[str(chunk.id) for chunk in embedded],
+                    wait=True
                 )
             
             return True
@@ -155,58 +305,31 @@ class QdrantDatabase(VectorDatabase):
     async def search_vectors(
         self,
         collection_name: str,
-        query_vector: List[float],
+        query_vector: Vector,
         limit: int = 10,
         filters: Optional[Dict[str, Any]] = None,
         threshold: float = 0.7
     ) -> List[SearchResult]:
         """Search for similar vectors in Qdrant."""
         try:
+            query_vector = self._prepare_vectors(query_vector)
+            
             # Build filter conditions
-            filter_conditions = None
-            if filters:
-                conditions = []
-                for key, value in filters.items():
-                    if isinstance(value, list):
-                        conditions.append(
-                            models.FieldCondition(
-                                key=key,
-                                match=models.MatchAny(any=value)
-                            )
-                        )
-                    else:
-                        conditions.append(
-                            models.FieldCondition(
-                                key=key,
-                                match=models.MatchValue(value=value)
-                            )
-                        )
-                
-                if conditions:
-                    filter_conditions = models.Filter(must=conditions)
+            filter_conditions = _qdrant_filter(filters) if filters else None
             
             # Perform search
-            search_results = self.client.search(
+            search_results = await _run(
+                self.client.search,
                 collection_name=collection_name,
                 query_vector=query_vector,
                 query_filter=filter_conditions,
                 limit=limit,
-                score_threshold=threshold
+                score_threshold=threshold,
+                with_payload=self.SEARCH_PAYLOAD,
+                search_params=self.search_params
             )
             
-            # Convert to SearchResult objects
-            results = []
-            for hit in search_results:
-                result = SearchResult(
-                    chunk_id=UUID(hit.id),
-                    document_id=UUID(hit.payload["document_id"]),
-                    content=hit.payload["content"],
-                    score=hit.score,
-                    metadata=hit.payload.get("metadata", {})
-                )
-                results.append(result)
-            
-            return results
+            return [self._to_search_result(hit) for hit in search_results]
             
         except Exception as e:
             raise VectorDBError(
@@ -214,6 +337,21 @@ class QdrantDatabase(VectorDatabase):
                 error_code=ErrorCodes.VECTOR_SEARCH_FAILED
             )
     
+    @staticmethod
+    def _to_search_result(hit: models.ScoredPoint) -> SearchResult:
+        """Convert a Qdrant hit to a SearchResult.
+        
+        Raw id strings are parsed by pydantic-core's native UUID validator,
+        not uuid.UUID.__init__.
+        """
+        return SearchResult(
+            chunk_id=hit.id,
+            document_id=hit.payload["document_id"],
+            content=hit.payload["content"],
+            score=hit.score,
+            metadata=hit.payload.get("metadata", {})
+        )
+    
     async def delete_vectors(
         self,
         collection_name: str,
@@ -222,7 +360,8 @@ class QdrantDatabase(VectorDatabase):
         """Delete vectors from Qdrant collection."""
         try:
             point_ids = [str(chunk_id) for chunk_id in chunk_ids]
-            self.client.delete(
+            await _run(
+                self.client.delete,
                 collection_name=collection_name,
                 points_selector=models.PointIdsList(
                     points=point_ids
@@ -243,12 +382,12 @@ class QdrantDatabase(VectorDatabase):
     ) -> bool:
         """Update a vector in Qdrant collection."""
         try:
-            if not chunk.embedding:
+            if chunk.embedding is None:
                 return False
             
             point = models.PointStruct(
                 id=str(chunk.id),
-                vector=chunk.embedding,
+                vector=self._prepare_vectors(chunk.embedding),
                 payload={
                     "document_id": str(chunk.document_id),
                     "content": chunk.content,
@@ -260,7 +399,8 @@ class QdrantDatabase(VectorDatabase):
                 }
             )
             
-            self.client.upsert(
+            await _run(
+                self.client.upsert,
                 collection_name=collection_name,
                 points=[point]
             )
@@ -275,7 +415,7 @@ class QdrantDatabase(VectorDatabase):
     async def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
         """Get Qdrant collection information."""
         try:
-            collection_info = self.client.get_collection(collection_name)
+            collection_info = await _run(self.client.get_collection, collection_name)
             return {
                 "name": collection_name,
                 "vectors_count": collection_info.vectors_count,
@@ -294,58 +434,82 @@ class QdrantDatabase(VectorDatabase):
 
 
 class WeaviateDatabase(VectorDatabase):
-    """Weaviate vector database implementation."""
+    """Weaviate vector database implementation (v4 client)."""
+    
+    DELETE_BATCH_SIZE = 10000
     
     def __init__(self):
-        self.client = weaviate.Client(
-            url=settings.vector_db.weaviate_url,
-            auth_client_secret=weaviate.AuthApiKey(
+        url = urlparse(settings.vector_db.weaviate_url)
+        secure = url.scheme == "https"
+        self.client = weaviate.connect_to_custom(
+            http_host=url.hostname,
+            http_port=url.port or (443 if secure else 80),
+            http_secure=secure,
+            grpc_host=url.hostname,
+            grpc_port=settings.vector_db.weaviate_grpc_port,
+            grpc_secure=secure,
+            auth_credentials=AuthApiKey(
                 api_key=settings.vector_db.weaviate_api_key
             ) if settings.vector_db.weaviate_api_key else None
         )
     
+    @staticmethod
+    def _properties(chunk: DocumentChunk) -> Dict[str, Any]:
+        """Build the object properties stored for a chunk."""
+        return {
+            "document_id": str(chunk.document_id),
+            "content": chunk.content,
+            "chunk_index": chunk.chunk_index,
+            "metadata": chunk.metadata,
+        }
+    
     async def create_collection(self, collection_name: str, dimension: int) -> bool:
-        """Create a new Weaviate class (collection)."""
+        """Create a new Weaviate collection."""
         try:
-            # Check if class exists
-            if self.client.schema.exists(collection_name):
+            # Check if collection exists
+            if await _run(self.client.collections.exists, collection_name):
                 return True
             
-            # Create class schema
-            class_schema = {
-                "class": collection_name,
-                "description": f"Document chunks for {collection_name}",
-                "vectorizer": "none",
-                "properties": [
-                    {
-                        "name": "document_id",
-                        "dataType": ["string"],
-                        "description": "Document ID"
-                    },
-                    {
-                        "name": "content",
-                        "dataType": ["text"],
-                        "description": "Chunk content"
-                    },
-                    {
-                        "name": "chunk_index",
-                        "dataType": ["int"],
-                        "description": "Chunk index"
-                    },
-                    {
-                        "name": "metadata",
-                        "dataType": ["object"],
-                        "description": "Chunk metadata"
-                    }
+            await _run(
+                self.client.collections.create,
+                name=collection_name,
+                description=f"Document chunks for {collection_name}",
+                vectorizer_config=Configure.Vectorizer.none(),
+                properties=[
+                    Property(
+                        name="document_id",
+                        data_type=DataType.TEXT,
+                        description="Document ID"
+                    ),
+                    Property(
+                        name="content",
+                        data_type=DataType.TEXT,
+                        description="Chunk content"
+                    ),
+                    Property(
+                        name="chunk_index",
+                        data_type=DataType.INT,
+                        description="Chunk index"
+                    ),
+                    Property(
+                        name="metadata",
+                        data_type=DataType.OBJECT,
+                        description="Chunk metadata",
+                        nested_properties=[
+                            Property(name="embedding_model", data_type=DataType.TEXT),
+                            Property(name="embedding_dimension", data_type=DataType.INT),
+                            Property(name="language", data_type=DataType.TEXT),
+                            Property(name="chunk_length", data_type=DataType.INT),
+                            Property(name="chunking_strategy", data_type=DataType.TEXT),
+                        ]
+                    ),
                 ]
-            }
-            
-            self.client.schema.create_class(class_schema)
+            )
             return True
             
         except Exception as e:
             raise VectorDBError(
-                f"Failed to create Weaviate class: {str(e)}",
+                f"Failed to create Weaviate collection: {str(e)}",
                 error_code=ErrorCodes.VECTOR_DB_CONNECTION_FAILED
             )
     
@@ -354,27 +518,27 @@ class WeaviateDatabase(VectorDatabase):
         collection_name: str,
         chunks: List[DocumentChunk]
     ) -> bool:
-        """Insert vectors into Weaviate class."""
+        """Insert vectors into Weaviate collection."""
         try:
-            with self.client.batch as batch:
-                batch.batch_size = 100
-                
-                for chunk in chunks:
-                    if not chunk.embedding:
-                        continue
-                    
-                    properties = {
-                        "document_id": str(chunk.document_id),
-                        "content": chunk.content,
-                        "chunk_index": chunk.chunk_index,
-                        "metadata": chunk.metadata,
-                    }
-                    
-                    batch.add_data_object(
-                        data_object=properties,
-                        class_name=collection_name,
-                        uuid=str(chunk.id),
-                        vector=chunk.embedding
+            objects = [
+                DataObject(
+                    properties=self._properties(chunk),
+                    uuid=str(chunk.id),
+                    vector=chunk.embedding
+                )
+                for chunk in chunks
+                if chunk.embedding is not None
+            ]
+            
+            if objects:
+                collection = self.client.collections.get(collection_name)
+                # Streams the objects over gRPC in one call
+                response = await _run(collection.data.insert_many, objects)
+                if response.has_errors:
+                    errors = list(response.errors.values())
+                    raise VectorDBError(
+                        f"{len(errors)} objects rejected, first error: {errors[0].message}",
+                        error_code=ErrorCodes.VECTOR_INSERT_FAILED
                     )
             
             return True
@@ -388,53 +552,46 @@ class WeaviateDatabase(VectorDatabase):
     async def search_vectors(
         self,
         collection_name: str,
-        query_vector: List[float],
+        query_vector: Vector,
         limit: int = 10,
         filters: Optional[Dict[str, Any]] = None,
         threshold: float = 0.7
     ) -> List[SearchResult]:
         """Search for similar vectors in Weaviate."""
         try:
-            query = (
-                self.client.query
-                .get(collection_name, ["document_id", "content", "chunk_index", "metadata"])
-                .with_near_vector({"vector": query_vector})
-                .with_limit(limit)
-                .with_additional(["id", "distance"])
-            )
-            
             # Add filters if provided
+            where_filter = None
             if filters:
-                where_filter = {"operator": "And", "operands": []}
-                for key, value in filters.items():
-                    where_filter["operands"].append({
-                        "path": [key],
-                        "operator": "Equal",
-                        "valueString": str(value)
-                    })
-                query = query.with_where(where_filter)
-            
-            result = query.do()
-            
-            # Convert to SearchResult objects
-            results = []
-            if "data" in result and "Get" in result["data"]:
-                for item in result["data"]["Get"][collection_name]:
-                    # Convert distance to similarity score
-                    distance = item["_additional"]["distance"]
-                    score = 1 - distance  # Convert distance to similarity
-                    
-                    if score >= threshold:
-                        result_obj = SearchResult(
-                            chunk_id=UUID(item["_additional"]["id"]),
-                            document_id=UUID(item["document_id"]),
-                            content=item["content"],
-                            score=score,
-                            metadata=item.get("metadata", {})
-                        )
-                        results.append(result_obj)
+                where_filter = Filter.all_of([
+                    Filter.by_property(key).contains_any(value)
+                    if isinstance(value, list)
+                    else Filter.by_property(key).equal(value)
+                    for key, value in filters.items()
+                ])
             
-            return results
+            collection = self.client.collections.get(collection_name)
+            response = await _run(
+                collection.query.near_vector,
+                near_vector=query_vector,
+                limit=limit,
+                # Prune below-threshold hits server-side (score = 1 - distance)
+                distance=1 - threshold,
+                filters=where_filter,
+                return_properties=["document_id", "content", "metadata"],
+                return_metadata=MetadataQuery(distance=True)
+            )
+            
+            # Convert to SearchResult objects (ids validated by pydantic)
+            return [
+                SearchResult(
+                    chunk_id=obj.uuid,
+                    document_id=obj.properties["document_id"],
+                    content=obj.properties["content"],
+                    score=1 - obj.metadata.distance,
+                    metadata=obj.properties.get("metadata") or {}
+                )
+                for obj in response.objects
+            ]
             
         except Exception as e:
             raise VectorDBError(
@@ -447,12 +604,19 @@ class WeaviateDatabase(VectorDatabase):
         collection_name: str,
         chunk_ids: List[UUID]
     ) -> bool:
-        """Delete vectors from Weaviate class."""
+        """Delete vectors from Weaviate collection."""
         try:
-            for chunk_id in chunk_ids:
-                self.client.data_object.delete(
-                    uuid=str(chunk_id),
-                    class_name=collection_name
+            ids = [str(chunk_id) for chunk_id in chunk_ids]
+            collection = self.client.collections.get(collection_name)
+            
+            # One batch request per window instead of one request per object;
+            # windows stay under Weaviate's per-request match limit
+            for start in range(0, len(ids), self.DELETE_BATCH_SIZE):
+                await _run(
+                    collection.data.delete_many,
+                    where=Filter.by_id().contains_any(
+                        ids[start:start + self.DELETE_BATCH_SIZE]
+                    )
                 )
             return True
             
@@ -467,22 +631,16 @@ class WeaviateDatabase(VectorDatabase):
         collection_name: str,
         chunk: DocumentChunk
     ) -> bool:
-        """Update a vector in Weaviate class."""
+        """Update a vector in Weaviate collection."""
         try:
-            if not chunk.embedding:
+            if chunk.embedding is None:
                 return False
             
-            properties = {
-                "document_id": str(chunk.document_id),
-                "content": chunk.content,
-                "chunk_index": chunk.chunk_index,
-                "metadata": chunk.metadata,
-            }
-            
-            self.client.data_object.replace(
+            collection = self.client.collections.get(collection_name)
+            await _run(
+                collection.data.replace,
                 uuid=str(chunk.id),
-                class_name=collection_name,
-                data_object=properties,
+                properties=self._properties(chunk),
                 vector=chunk.embedding
             )
             return True
@@ -494,62 +652,78 @@ class WeaviateDatabase(VectorDatabase):
             )
     
     async def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
-        """Get Weaviate class information."""
+        """Get Weaviate collection information."""
         try:
-            schema = self.client.schema.get(collection_name)
+            collection = self.client.collections.get(collection_name)
+            config = await _run(collection.config.get)
             # Get object count
-            result = (
-                self.client.query
-                .aggregate(collection_name)
-                .with_meta_count()
-                .do()
-            )
-            
-            count = 0
-            if "data" in result and "Aggregate" in result["data"]:
-                count = result["data"]["Aggregate"][collection_name][0]["meta"]["count"]
+            aggregate = await _run(collection.aggregate.over_all, total_count=True)
             
+            schema = config.to_dict()
             return {
                 "name": collection_name,
                 "description": schema.get("description", ""),
                 "properties": schema.get("properties", []),
-                "objects_count": count,
+                "objects_count": aggregate.total_count or 0,
                 "vectorizer": schema.get("vectorizer", "none"),
             }
             
         except Exception as e:
             raise VectorDBError(
-                f"Failed to get Weaviate class info: {str(e)}",
+                f"Failed to get Weaviate collection info: {str(e)}",
                 error_code=ErrorCodes.VECTOR_DB_CONNECTION_FAILED
             )
+    
+    async def close(self) -> None:
+        """Close the client's HTTP and gRPC connections."""
+        await _run(self.client.close)
 
 
 class StorageAgent(LoggerMixin):
     """Storage agent for vector database management."""
     
+    VECTOR_BATCH_SIZE = 512
+    
+    DATABASE_BACKENDS = {
+        "qdrant": QdrantDatabase,
+        "weaviate": WeaviateDatabase,
+    }
+    
     def __init__(self):
         self.vector_databases = self._initialize_databases()
         self.default_db = self._get_default_database()
         self.default_collection = settings.vector_db.qdrant_collection_name
     
     def _initialize_databases(self) -> Dict[str, VectorDatabase]:
-        """Initialize available vector databases."""
+        """Initialize available vector databases.
+        
+        Backends are constructed concurrently, so startup waits on the
+        slowest connection rather than the sum of them.
+        """
         databases = {}
         
-        # Qdrant
-        try:
-            databases["qdrant"] = QdrantDatabase()
-        except Exception as e:
-            self.logger.warning(f"Failed to initialize Qdrant: {e}")
+        with ThreadPoolExecutor(max_workers=len(self.DATABASE_BACKENDS)) as pool:
+            futures = {
+                name: pool.submit(backend)
+                for name, backend in self.DATABASE_BACKENDS.items()
+            }
         
-        # Weaviate
-        try:
-            databases["weaviate"] = WeaviateDatabase()
-        except Exception as e:
-            self.logger.warning(f"Failed to initialize Weaviate: {e}")
+        for name, future in futures.items():
+            try:
+                databases[name] = future.result()
+            except Exception as e:
+                self.logger.warning(f"Failed to initialize {name}: {e}")
         
         return databases
     
+    async def close(self) -> None:
+        """Release the connections held by every vector database backend."""
+        for name, db in self.vector_databases.items():
+            try:
+                await db.close()
+            except Exception as e:
+                self.logger.warning(f"Failed to close {name}: {e}")
+    
     def _get_default_database(self) -> VectorDatabase:
         """Get the default vector database."""
         provider = settings.vector_db.default_provider
@@ -609,7 +783,12 @@ class StorageAgent(LoggerMixin):
         collection_name: Optional[str] = None,
         database_name: Optional[str] = None
     ) -> bool:
-        """Store chunks in both vector database and SQL database."""
+        """Store chunks in both vector database and SQL database.
+        
+        Each chunk's ``embedding`` is set to None once its batch has been sent to
+        the vector store, so the caller's chunks no longer carry embeddings
+        afterwards, even if the SQL write fails. Re-embed before retrying.
+        """
         
         collection = collection_name or self.default_collection
         
@@ -620,29 +799,60 @@ class StorageAgent(LoggerMixin):
             collection_name=collection
         )
         
+        db = self.vector_databases.get(database_name) if database_name else self.default_db
+        
         try:
-            # Store in vector database
-            db = self.vector_databases.get(database_name) if database_name else self.default_db
-            await db.insert_vectors(collection, chunks)
-            
-            # Store metadata in SQL database
-            db_chunks = []
-            for chunk in chunks:
-                db_chunk = DBDocumentChunk(
-                    id=chunk.id,
-                    document_id=chunk.document_id,
-                    content=chunk.content,
-                    chunk_index=chunk.chunk_index,
-                    start_char=chunk.start_char,
-                    end_char=chunk.end_char,
-                    metadata=chunk.metadata,
-                    created_at=chunk.created_at,
-                    updated_at=chunk.updated_at
-                )
-                db_chunks.append(db_chunk)
+            # Build plain metadata rows for a bulk SQL insert
+            rows = [
+                {
+                    "id": chunk.id,
+                    "document_id": chunk.document_id,
+                    "content": chunk.content,
+                    "chunk_index": chunk.chunk_index,
+                    "start_char": chunk.start_char,
+                    "end_char": chunk.end_char,
+                    "metadata": chunk.metadata,
+                    "created_at": chunk.created_at,
+                    "updated_at": chunk.updated_at,
+                }
+                for chunk in chunks
+            ]
+            
+            uploaded_ids: List[UUID] = []
+            existing_ids: Optional[Set[UUID]] = None
+            
+            async def write_sql() -> None:
+                nonlocal existing_ids
+                # Vectors of chunks already in SQL are valid and must survive a rollback
+                existing_ids = await self._existing_chunk_ids(db_session, [row["id"] for row in rows])
+                await self._write_sql_chunks(db_session, rows)
             
-            db_session.add_all(db_chunks)
-            await db_session.commit()
+            # Vector upsert and SQL insert are independent, overlap them
+            vector_write, sql_write = await asyncio.gather(
+                self._write_vectors(db, collection, chunks, uploaded_ids),
+                write_sql(),
+                return_exceptions=True
+            )
+            try:
+                for outcome in (vector_write, sql_write):
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                await db_session.commit()
+            except Exception:
+                if existing_ids is None:
+                    # Without the lookup, deleting could remove valid vectors of stored chunks
+                    self.logger.warning(
+                        "Skipping vector compensation, existing chunks unknown",
+                        num_vectors=len(uploaded_ids),
+                        collection_name=collection
+                    )
+                else:
+                    orphaned_ids = [
+                        chunk_id for chunk_id in uploaded_ids if chunk_id not in existing_ids
+                    ]
+                    if orphaned_ids:
+                        await self._discard_vectors(db, collection, orphaned_ids)
+                raise
             
             self.logger.info(
                 "Chunks stored successfully",
@@ -661,9 +871,73 @@ class StorageAgent(LoggerMixin):
             })
             raise
     
+    async def _write_vectors(
+        self,
+        db: VectorDatabase,
+        collection_name: str,
+        chunks: List[DocumentChunk],
+        uploaded_ids: List[UUID]
+    ) -> None:
+        """Upload embeddings in bounded batches, releasing each batch once sent.
+        
+        Ids are recorded before each upload: a failed batch may still have
+        written part of its vectors, and deleting unwritten ids is harmless.
+        """
+        for start in range(0, len(chunks), self.VECTOR_BATCH_SIZE):
+            batch = chunks[start:start + self.VECTOR_BATCH_SIZE]
+            uploaded_ids.extend(chunk.id for chunk in batch)
+            await db.insert_vectors(collection_name, batch)
+            
+            # The vector store owns these embeddings now; drop the local copies
+            for chunk in batch:
+                chunk.embedding = None
+    
+    async def _existing_chunk_ids(
+        self,
+        db_session: AsyncSession,
+        chunk_ids: List[UUID]
+    ) -> Set[UUID]:
+        """Return the ids among chunk_ids that already have SQL rows."""
+        if not chunk_ids:
+            return set()
+        
+        result = await db_session.execute(
+            select(DBDocumentChunk.id).where(DBDocumentChunk.id.in_(chunk_ids))
+        )
+        return set(result.scalars())
+    
+    async def _write_sql_chunks(
+        self,
+        db_session: AsyncSession,
+        rows: List[Dict[str, Any]]
+    ) -> None:
+        """Insert chunk rows in one multi-row statement without committing."""
+        if not rows:
+            return
+        
+        # Core insert skips the ORM unit of work; re-stored chunks are no-ops
+        stmt = insert(DBDocumentChunk).on_conflict_do_nothing(index_elements=["id"])
+        await db_session.execute(stmt, rows)
+    
+    async def _discard_vectors(
+        self,
+        db: VectorDatabase,
+        collection_name: str,
+        chunk_ids: List[UUID]
+    ) -> None:
+        """Compensate a vector write whose SQL counterpart failed."""
+        try:
+            await db.delete_vectors(collection_name, chunk_ids)
+        except Exception as e:
+            log_error(e, {
+                "agent": "StorageAgent",
+                "operation": "discard_vectors",
+                "collection_name": collection_name
+            })
+    
     async def search_similar_chunks(
         self,
-        query_vector: List[float],
+        query_vector: Vector,
         search_query: SearchQuery,
         collection_name: Optional[str] = None,
         database_name: Optional[str] = None
@@ -5,7 +5,12 @@ Handles LLM-based response generation with citations and source tracking.
 
 import asyncio
 import json
-from typing import Any, Dict, List, Optional, Union, AsyncIterator
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, AsyncIterator
 from uuid import UUID, uuid4
 
 # Imports conditionnels pour les fournisseurs (OpenAI supprimé)
@@ -19,11 +24,18 @@ try:
 except ImportError:
     ollama = None
 
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 from core.config import settings
 from core.exceptions import LLMError, ErrorCodes
+from core.http import HTTP_LIMITS, close_shared_client, get_shared_client
 from core.logging import LoggerMixin, log_agent_action, log_error, log_performance
 from core.models import (
-    ChatMessage, QueryRequest, QueryResponse, SearchResult, LLMConfig
+    ChatMessage, DocumentMetadata, QueryRequest, QueryResponse, SearchResult, LLMConfig,
+    StreamingQueryResponse
 )
 from core.providers import AIProviderManager
 from database.models import Query as DBQuery
@@ -36,6 +48,145 @@ except ImportError:
     CoreSothemaAIProvider = None
     SOTHEMAAI_AVAILABLE = False
 
+# Citation markers like [Source: 1]
+_CITATION_RE = re.compile(r'\[Source:\s*(\d+)\]')
+
+_STREAM_END = object()
+
+# Document prefix sent for summarization (about 4000 characters of English)
+SUMMARY_INPUT_TOKENS = 1000
+
+
+class _SingleShotAsyncIter:
+    """Async iterator that yields one value, for non-streaming stream=True paths."""
+    
+    __slots__ = ("_value", "_done")
+    
+    def __init__(self, value: str):
+        self._value = value
+        self._done = False
+    
+    def __aiter__(self) -> "_SingleShotAsyncIter":
+        return self
+    
+    async def __anext__(self) -> str:
+        if self._done:
+            raise StopAsyncIteration
+        self._done = True
+        return self._value
+
+
+# BPE encoding for token counts. On a cold tiktoken cache, loading it downloads
+# the BPE file over HTTP (no timeout), so it is only ever loaded on a background
+# thread; air-gapped images can pre-populate TIKTOKEN_CACHE_DIR. Until it is
+# loaded, or if loading fails, counts use the length-based estimate.
+_encoding = None
+_encoding_load: Optional[Future] = None
+
+# How long SynthesisAgent.initialize() waits for the encoding at startup
+ENCODING_LOAD_TIMEOUT = 10.0
+
+
+def _load_encoding() -> None:
+    """Load the BPE encoding (blocking)."""
+    global _encoding
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Keep the length-based estimate
+        pass
+
+
+def _start_encoding_load() -> Optional[Future]:
+    """Start loading the encoding on a background thread, once per process."""
+    global _encoding_load
+    if _encoding_load is None and tiktoken is not None:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tiktoken")
+        _encoding_load = executor.submit(_load_encoding)
+        executor.shutdown(wait=False)
+    return _encoding_load
+
+
+def _get_encoding():
+    """Return the loaded BPE encoding, or None if it is not (yet) available."""
+    return _encoding
+
+
+def _count_tokens(text: str) -> int:
+    """Count tokens in text, falling back to ~4 characters per token."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=16)
+def _count_template_tokens(text: str, encoding_loaded: bool) -> int:
+    """Count tokens of fixed prompt text; never pass user or context text."""
+    return _count_tokens(text)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens, ending on a token or word boundary."""
+    encoding = _get_encoding()
+    # Only the head of the text can survive; never encode a whole large document
+    head = text[:max_tokens * 8]
+    
+    if encoding is None:
+        head = head[:max_tokens * 4]
+        if len(head) < len(text):
+            head = head.rsplit(' ', 1)[0]
+        return head
+    
+    tokens = encoding.encode(head, disallowed_special=())
+    if len(tokens) <= max_tokens and len(head) == len(text):
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+async def _batched(
+    stream: AsyncIterator[str],
+    max_chars: int = 64,
+    max_delay: float = 0.02
+) -> AsyncIterator[str]:
+    """Coalesce small stream chunks, flushing on size or after max_delay."""
+    iterator = stream.__aiter__()
+    buffer: List[str] = []
+    size = 0
+    pending = None
+    
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(iterator, _STREAM_END))
+            
+            # Only bound the wait while there is something to flush
+            done, _ = await asyncio.wait({pending}, timeout=max_delay if buffer else None)
+            if not done:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+                continue
+            
+            part = pending.result()
+            pending = None
+            if part is _STREAM_END:
+                break
+            if part:
+                part = str(part)
+                buffer.append(part)
+                size += len(part)
+                if size >= max_chars:
+                    yield "".join(buffer)
+                    buffer.clear()
+                    size = 0
+        
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
 
 class LLMProvider:
     """Base class for LLM providers."""
@@ -57,6 +208,33 @@ class LLMProvider:
         raise NotImplementedError
 
 
+class _LazyProvider(LLMProvider):
+    """Proxy that builds the real provider (and its client) on first use."""
+    
+    def __init__(self, config: LLMConfig, factory: Callable[[LLMConfig], LLMProvider]):
+        super().__init__(config)
+        self._factory = factory
+        self._provider: Optional[LLMProvider] = None
+    
+    def _get_provider(self) -> LLMProvider:
+        if self._provider is None:
+            self._provider = self._factory(self.config)
+        return self._provider
+    
+    async def generate_response(
+        self,
+        messages: List[ChatMessage],
+        stream: bool = False,
+        **kwargs
+    ) -> Union[str, AsyncIterator[str]]:
+        """Generate response from the underlying provider."""
+        return await self._get_provider().generate_response(messages, stream, **kwargs)
+    
+    async def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding with the underlying provider."""
+        return await self._get_provider().generate_embedding(text)
+
+
 class SothemaAILLMProvider(LLMProvider):
     """Wrapper pour SothemaAI provider pour compatibilité avec LLMProvider."""
     
@@ -77,25 +255,19 @@ class SothemaAILLMProvider(LLMProvider):
         """Generate response using SothemaAI."""
         try:
             # Convert messages to string format for SothemaAI
-            prompt = "\n".join([f"{msg.role}: {msg.content}" for msg in messages])
+            prompt = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+            
+            response = await self.core_provider.generate_text(
+                prompt=prompt,
+                max_tokens=self.config.max_tokens,
+                temperature=self.config.temperature
+            )
             
             if stream:
-                # Return a simple generator for streaming
-                async def response_generator():
-                    response = await self.core_provider.generate_text(
-                        prompt=prompt,
-                        max_tokens=self.config.max_tokens,
-                        temperature=self.config.temperature
-                    )
-                    yield response
-                
-                return response_generator()
+                # The client's streaming API only re-slices a finished completion
+                # with sleeps in between; expose the response as a one-item stream
+                return _SingleShotAsyncIter(response)
             else:
-                response = await self.core_provider.generate_text(
-                    prompt=prompt,
-                    max_tokens=self.config.max_tokens,
-                    temperature=self.config.temperature
-                )
                 return response
                 
         except Exception as e:
@@ -119,7 +291,8 @@ class CohereProvider(LLMProvider):
             raise ImportError("Cohere library not available")
         
         self.client = cohere.AsyncClient(
-            api_key=settings.llm.cohere_api_key
+            api_key=settings.llm.cohere_api_key,
+            httpx_client=get_shared_client()
         )
     
     async def generate_response(
@@ -152,11 +325,8 @@ class CohereProvider(LLMProvider):
             )
             
             if stream:
-                # Return a simple generator for streaming
-                async def response_generator():
-                    yield response.text
-                
-                return response_generator()
+                # Full response already received; expose it as a one-item stream
+                return _SingleShotAsyncIter(response.text)
             else:
                 return response.text
                 
@@ -175,9 +345,18 @@ class OllamaProvider(LLMProvider):
         if ollama is None:
             raise ImportError("Ollama library not available")
             
+        # Ollama builds its own httpx client; give it the same pool limits but
+        # keep its own timeout, since local generations can run for minutes
         self.client = ollama.AsyncClient(
-            host=settings.llm.ollama_base_url
+            host=settings.llm.ollama_base_url,
+            timeout=settings.llm.ollama_timeout,
+            limits=HTTP_LIMITS
         )
+        self._base_options = {
+            "temperature": config.temperature,
+            "num_predict": config.max_tokens,
+            "top_p": config.top_p
+        }
     
     async def generate_response(
         self,
@@ -187,7 +366,7 @@ class OllamaProvider(LLMProvider):
     ) -> Union[str, AsyncIterator[str]]:
         """Generate response using Ollama."""
         try:
-            # Convert messages to Ollama format
+            # Convert messages to Ollama format (the client expects a sequence)
             ollama_messages = [
                 {"role": msg.role, "content": msg.content}
                 for msg in messages
@@ -197,24 +376,12 @@ class OllamaProvider(LLMProvider):
                 model=self.config.model,
                 messages=ollama_messages,
                 stream=stream,
-                options={
-                    "temperature": self.config.temperature,
-                    "num_predict": self.config.max_tokens,
-                    "top_p": self.config.top_p,
-                    **kwargs
-                }
+                options={**self._base_options, **kwargs} if kwargs else self._base_options
             )
             
             if stream:
-                # Return a simple generator for streaming  
-                async def response_generator():
-                    # Handle different response types from Ollama
-                    if isinstance(response, dict) and 'message' in response:
-                        yield response['message']['content']
-                    else:
-                        yield str(response)
-                
-                return response_generator()
+                # With stream=True the client returns an async iterator of parts
+                return self._stream_content(response)
             else:
                 # Handle different response types from Ollama
                 if isinstance(response, dict) and 'message' in response:
@@ -227,6 +394,12 @@ class OllamaProvider(LLMProvider):
                 f"Ollama API error: {str(e)}",
                 error_code=ErrorCodes.LLM_REQUEST_FAILED
             )
+    
+    @staticmethod
+    async def _stream_content(response: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+        """Yield the text of each streamed chat part."""
+        async for part in response:
+            yield part['message']['content']
 
 
 class PromptTemplate:
@@ -266,18 +439,44 @@ Question: {question}
 
 Instructions:
 - Use only the information provided in the context
-- Cite sources using [Source: {source_id}] format
+- Cite sources using [Source: ID] format
 - If the context is insufficient, clearly state this
 - Provide a helpful and accurate response
 
 Answer:"""
     
+    # Template split around its placeholders so formatting is a plain join
+    _RAG_PREFIX, _RAG_MID, _RAG_SUFFIX = re.split(r"\{context\}|\{question\}", RAG_PROMPT_TEMPLATE)
+    
+    # Fixed head of the chat system message; the retrieved context follows it
+    _SYSTEM_PREFIX = f"{SYSTEM_PROMPT}\n\nRelevant context:\n"
+    
     SUMMARY_PROMPT = """Please provide a concise summary of the following text, highlighting the key points:
 
 {text}
 
 Summary:"""
     
+    @staticmethod
+    def _resolve_filename(result: SearchResult) -> str:
+        """Resolve a display filename for a search result."""
+        # DocumentMetadata has no filename field: look in custom_fields, then
+        # source/title, then the chunk metadata
+        doc_metadata = result.document_metadata
+        if doc_metadata is not None:
+            if doc_metadata.custom_fields:
+                doc_filename = doc_metadata.custom_fields.get('filename')
+            else:
+                doc_filename = doc_metadata.source or doc_metadata.title
+            if doc_filename:
+                return doc_filename
+        
+        metadata = result.metadata
+        if metadata:
+            return metadata.get('filename', metadata.get('source', 'Unknown'))
+        
+        return "Unknown"
+    
     @classmethod
     def format_rag_prompt(
         cls,
@@ -287,50 +486,61 @@ Summary:"""
     ) -> str:
         """Format a RAG prompt with context and question."""
         context_parts = []
-        current_length = 0
+        budget = max_context_length
         
         for i, result in enumerate(search_results):
-            # Safe access to document filename - DocumentMetadata doesn't have filename
-            # We need to use the metadata field or document_metadata dict
-            doc_filename = "Unknown"
-            if result.document_metadata:
-                # DocumentMetadata is a Pydantic model, check for custom_fields or metadata
-                if hasattr(result.document_metadata, 'custom_fields') and result.document_metadata.custom_fields:
-                    doc_filename = result.document_metadata.custom_fields.get('filename', 'Unknown')
-                elif hasattr(result.document_metadata, 'source') and result.document_metadata.source:
-                    doc_filename = result.document_metadata.source
-                elif hasattr(result.document_metadata, 'title') and result.document_metadata.title:
-                    doc_filename = result.document_metadata.title
-            
-            # Also check result.metadata for filename information
-            if doc_filename == "Unknown" and result.metadata:
-                doc_filename = result.metadata.get('filename', result.metadata.get('source', 'Unknown'))
-            
-            source_info = f"[Source: {i+1}] Document: {doc_filename}\n"
-            content = f"{source_info}{result.content}\n\n"
-            
-            if current_length + len(content) > max_context_length:
+            piece = (
+                f"[Source: {i+1}] Document: {cls._resolve_filename(result)}\n"
+                f"{result.content}\n\n"
+            )
+            
+            if len(piece) > budget:
                 break
             
-            context_parts.append(content)
-            current_length += len(content)
+            context_parts.append(piece)
+            budget -= len(piece)
         
         context = "".join(context_parts)
         
-        return cls.RAG_PROMPT_TEMPLATE.format(
-            context=context,
-            question=question
-        )
+        return "".join((cls._RAG_PREFIX, context, cls._RAG_MID, question, cls._RAG_SUFFIX))
+    
+    @staticmethod
+    def prepare(
+        search_results: List[SearchResult]
+    ) -> Tuple[str, Tuple[List[Any], ...]]:
+        """Build the chat context block and the citation source columns in one pass.
+        
+        The columns are returned in CitationManager.add_sources_prepared order.
+        """
+        context_parts = []
+        columns = ([], [], [], [], [], [])
+        chunk_ids, document_ids, contents, scores, metadata, document_metadata = columns
+        
+        for i, result in enumerate(search_results, 1):
+            context_parts.append(f"[Source: {i}] {result.content}\n")
+            chunk_ids.append(result.chunk_id)
+            document_ids.append(result.document_id)
+            contents.append(result.content)
+            scores.append(result.score)
+            metadata.append(result.metadata)
+            document_metadata.append(result.document_metadata)
+        
+        return "\n".join(context_parts), columns
     
     @classmethod
     def format_chat_prompt(
         cls,
         messages: List[ChatMessage],
-        search_results: List[SearchResult]
-    ) -> List[ChatMessage]:
-        """Format chat messages with context."""
+        search_results: List[SearchResult],
+        context: Optional[str] = None
+    ) -> Tuple[List[ChatMessage], int]:
+        """Format chat messages with context.
+        
+        Pass context from prepare() to avoid formatting the sources twice.
+        Returns the messages and their total token count.
+        """
         if not search_results:
-            return messages
+            return messages, sum(_count_tokens(msg.content) for msg in messages)
         
         # Get the last user message
         last_user_message = None
@@ -340,38 +550,36 @@ Summary:"""
                 break
         
         if not last_user_message:
-            return messages
-        
-        # Format context
-        context_parts = []
-        for i, result in enumerate(search_results):
-            source_info = f"[Source: {i+1}]"
-            content = f"{source_info} {result.content}\n"
-            context_parts.append(content)
-        
-        context = "\n".join(context_parts)
+            return messages, sum(_count_tokens(msg.content) for msg in messages)
         
-        # Create new messages with context
-        formatted_messages = messages[:-1]  # All except last user message
+        if context is None:
+            context = cls.prepare(search_results)[0]
         
-        # Add system message with context
-        system_message = ChatMessage(
-            role="system",
-            content=f"{cls.SYSTEM_PROMPT}\n\nRelevant context:\n{context}"
+        # System message with context, history (all except last user message), question
+        system_content = f"{cls._SYSTEM_PREFIX}{context}"
+        formatted_messages = [ChatMessage(role="system", content=system_content)]
+        prompt_tokens = (
+            _count_template_tokens(cls._SYSTEM_PREFIX, _get_encoding() is not None)
+            + _count_tokens(context)
+            + _count_tokens(last_user_message.content)
         )
         
-        # Add user question
-        user_message = ChatMessage(
-            role="user",
-            content=last_user_message.content
+        for msg in islice(messages, len(messages) - 1):
+            formatted_messages.append(msg)
+            prompt_tokens += _count_tokens(msg.content)
+        
+        formatted_messages.append(
+            ChatMessage(role="user", content=last_user_message.content)
         )
         
-        return [system_message] + formatted_messages + [user_message]
+        return formatted_messages, prompt_tokens
 
 
 class ResponseGenerator:
     """Handles response generation and streaming."""
     
+    __slots__ = ("provider",)
+    
     def __init__(self, provider: LLMProvider):
         self.provider = provider
     
@@ -387,11 +595,16 @@ class ResponseGenerator:
         self,
         messages: List[ChatMessage],
         fallback_providers: List[LLMProvider],
-        stream: bool = False
+        stream: bool = False,
+        hedge: bool = False,
+        hedge_delay: float = 0.5
     ) -> Union[str, AsyncIterator[str]]:
         """Generate response with fallback providers."""
         providers = [self.provider] + fallback_providers
         
+        if hedge and not stream and len(providers) > 1:
+            return await self._generate_hedged(messages, providers, hedge_delay)
+        
         for provider in providers:
             try:
                 result = await provider.generate_response(messages, stream)
@@ -410,47 +623,106 @@ class ResponseGenerator:
             "All providers failed",
             error_code=ErrorCodes.LLM_REQUEST_FAILED
         )
+    
+    async def _generate_hedged(
+        self,
+        messages: List[ChatMessage],
+        providers: List[LLMProvider],
+        hedge_delay: float
+    ) -> str:
+        """Start the primary, add fallbacks after hedge_delay, keep the first success."""
+        tasks = {
+            asyncio.create_task(providers[0].generate_response(messages, False)): providers[0]
+        }
+        done, pending = await asyncio.wait(set(tasks), timeout=hedge_delay)
+        fallbacks_started = False
+        last_error: Optional[BaseException] = None
+        
+        try:
+            while True:
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    last_error = error
+                    log_error(error, {
+                        "provider": tasks[task].__class__.__name__,
+                        "operation": "generate_response"
+                    })
+                
+                # Primary is slow or failed: race the fallbacks against it
+                if not fallbacks_started:
+                    for provider in providers[1:]:
+                        task = asyncio.create_task(provider.generate_response(messages, False))
+                        tasks[task] = provider
+                        pending.add(task)
+                    fallbacks_started = True
+                
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        raise LLMError(
+            f"All providers failed: {str(last_error)}",
+            error_code=ErrorCodes.LLM_REQUEST_FAILED
+        ) from last_error
 
 
 class CitationManager:
     """Manages source citations and tracking."""
     
+    __slots__ = (
+        "_chunk_ids", "_document_ids", "_contents",
+        "_scores", "_metadata", "_document_metadata"
+    )
+    
     def __init__(self):
-        self.sources = {}
-        self.citation_map = {}
+        # Parallel per-field lists indexed by source_id - 1
+        self._chunk_ids: List[UUID] = []
+        self._document_ids: List[UUID] = []
+        self._contents: List[str] = []
+        self._scores: List[float] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._document_metadata: List[Optional[DocumentMetadata]] = []
+    
+    def add_sources_prepared(self, columns: Tuple[List[Any], ...]) -> None:
+        """Add sources from the columns built by PromptTemplate.prepare."""
+        chunk_ids, document_ids, contents, scores, metadata, document_metadata = columns
+        self._chunk_ids.extend(chunk_ids)
+        self._document_ids.extend(document_ids)
+        self._contents.extend(contents)
+        self._scores.extend(scores)
+        self._metadata.extend(metadata)
+        self._document_metadata.extend(document_metadata)
     
     def add_sources(self, search_results: List[SearchResult]) -> None:
         """Add search results as sources."""
-        for i, result in enumerate(search_results):
-            source_id = i + 1
-            self.sources[source_id] = {
-                "chunk_id": result.chunk_id,
-                "document_id": result.document_id,
-                "content": result.content,
-                "score": result.score,
-                "metadata": result.metadata,
-                "document_metadata": result.document_metadata
-            }
-            self.citation_map[str(result.chunk_id)] = source_id
+        for result in search_results:
+            self._chunk_ids.append(result.chunk_id)
+            self._document_ids.append(result.document_id)
+            self._contents.append(result.content)
+            self._scores.append(result.score)
+            self._metadata.append(result.metadata)
+            self._document_metadata.append(result.document_metadata)
     
     def get_citations(self, response_text: str) -> List[Dict[str, Any]]:
         """Extract citations from response text."""
-        import re
-        
         citations = []
-        # Find all citation patterns like [Source: 1] or [Source: ID]
-        citation_pattern = r'\[Source:\s*(\d+)\]'
-        matches = re.findall(citation_pattern, response_text)
+        num_sources = len(self._chunk_ids)
         
-        for match in matches:
-            source_id = int(match)
-            if source_id in self.sources:
+        for match in _CITATION_RE.finditer(response_text):
+            source_id = int(match.group(1))
+            i = source_id - 1
+            if 0 <= i < num_sources:
                 citations.append({
                     "source_id": source_id,
-                    "chunk_id": self.sources[source_id]["chunk_id"],
-                    "document_id": self.sources[source_id]["document_id"],
-                    "document_metadata": self.sources[source_id]["document_metadata"],
-                    "confidence": self.sources[source_id]["score"]
+                    "chunk_id": self._chunk_ids[i],
+                    "document_id": self._document_ids[i],
+                    "document_metadata": self._document_metadata[i],
+                    "confidence": self._scores[i]
                 })
         
         return citations
@@ -460,15 +732,15 @@ class CitationManager:
         if not citations:
             return ""
         
-        formatted = "\n\nSources:\n"
+        lines = ["\n\nSources:\n"]
         for citation in citations:
             doc_name = "Unknown Document"
             if citation.get("document_metadata"):
                 doc_name = citation["document_metadata"].get("filename", doc_name)
             
-            formatted += f"[{citation['source_id']}] {doc_name} (Confidence: {citation['confidence']:.2f})\n"
+            lines.append(f"[{citation['source_id']}] {doc_name} (Confidence: {citation['confidence']:.2f})\n")
         
-        return formatted
+        return "".join(lines)
 
 
 class SynthesisAgent(LoggerMixin):
@@ -492,7 +764,29 @@ class SynthesisAgent(LoggerMixin):
         
         # Composants de génération
         self.response_generator = ResponseGenerator(self.default_provider)
-        self.citation_manager = CitationManager()
+        
+        # Token encoding loads in the background; initialize() can wait for it
+        _start_encoding_load()
+    
+    async def initialize(self) -> None:
+        """Load the token encoding off the event loop, waiting a bounded time."""
+        encoding_load = _start_encoding_load()
+        if encoding_load is None:
+            return
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(encoding_load)),
+                timeout=ENCODING_LOAD_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            # Loading continues in the background; counts are estimated meanwhile
+            self.logger.warning("Token encoding not loaded yet, using estimated token counts")
+    
+    @classmethod
+    async def close(cls):
+        """Close the HTTP connection pool shared by the providers."""
+        await close_shared_client()
     
     def _setup_sothemaai_provider(self):
         """Configure le fournisseur SothemaAI si les paramètres sont disponibles."""
@@ -516,8 +810,7 @@ class SynthesisAgent(LoggerMixin):
                 )
                 
                 # Créer le fournisseur SothemaAI
-                sothemaai_provider = SothemaAILLMProvider(config)
-                self.providers["sothemaai"] = sothemaai_provider
+                self.providers["sothemaai"] = _LazyProvider(config, SothemaAILLMProvider)
                 
                 self.logger.info("SothemaAI provider configured successfully")
                 
@@ -525,7 +818,10 @@ class SynthesisAgent(LoggerMixin):
             self.logger.warning(f"Failed to setup SothemaAI provider: {str(e)}")
 
     def _initialize_providers(self) -> Dict[str, LLMProvider]:
-        """Initialize available LLM providers (SothemaAI focused)."""
+        """Initialize available LLM providers (SothemaAI focused).
+        
+        Clients are only built on a provider's first request.
+        """
         providers = {}
         
         # Cohere
@@ -537,7 +833,7 @@ class SynthesisAgent(LoggerMixin):
                 max_tokens=4000,
                 top_p=1.0
             )
-            providers["cohere"] = CohereProvider(config)
+            providers["cohere"] = _LazyProvider(config, CohereProvider)
         
         # Ollama
         config = LLMConfig(
@@ -547,7 +843,7 @@ class SynthesisAgent(LoggerMixin):
             max_tokens=4000,
             top_p=1.0
         )
-        providers["ollama"] = OllamaProvider(config)
+        providers["ollama"] = _LazyProvider(config, OllamaProvider)
         
         return providers
     
@@ -595,8 +891,12 @@ class SynthesisAgent(LoggerMixin):
         query_request: QueryRequest,
         search_results: List[SearchResult],
         conversation_history: Optional[List[ChatMessage]] = None
-    ) -> QueryResponse:
-        """Generate a response based on query and search results."""
+    ) -> Union[QueryResponse, StreamingQueryResponse]:
+        """Generate a response based on query and search results.
+        
+        Streaming requests return as soon as the provider starts producing
+        output; the stream is not consumed here.
+        """
         
         log_agent_action(
             agent_name="SynthesisAgent",
@@ -606,11 +906,11 @@ class SynthesisAgent(LoggerMixin):
             stream=query_request.stream
         )
         
-        start_time = asyncio.get_event_loop().time()
+        start_time = perf_counter()
         
         try:
-            # Set up citation manager
-            self.citation_manager.add_sources(search_results)
+            # The agent is shared across requests, so citation state is per call
+            citation_manager = CitationManager()
             
             # Prepare messages
             messages = []
@@ -621,14 +921,22 @@ class SynthesisAgent(LoggerMixin):
             
             # Format prompt with context
             if search_results:
-                formatted_messages = PromptTemplate.format_chat_prompt(
+                # One pass over the results feeds both the prompt and the citations
+                context, sources = PromptTemplate.prepare(search_results)
+                citation_manager.add_sources_prepared(sources)
+                
+                formatted_messages, prompt_tokens = PromptTemplate.format_chat_prompt(
                     messages + [ChatMessage(role="user", content=query_request.query)],
-                    search_results
+                    search_results,
+                    context=context
                 )
             else:
                 formatted_messages = messages + [
                     ChatMessage(role="user", content=query_request.query)
                 ]
+                prompt_tokens = sum(
+                    _count_tokens(msg.content) for msg in formatted_messages
+                )
             
             # Generate response
             if query_request.stream:
@@ -638,52 +946,47 @@ class SynthesisAgent(LoggerMixin):
                     stream=True
                 )
                 
-                # For streaming, collect the response and return it
-                response_parts = []
-                try:
-                    # Handle different types of response streams
-                    if response_stream is None:
-                        response_text = ""
-                    elif isinstance(response_stream, str):
-                        response_text = response_stream
-                    elif hasattr(response_stream, '__aiter__'):
-                        # Async iterator
-                        try:
-                            async for part in response_stream:
-                                if part:
-                                    response_parts.append(str(part))
-                        except TypeError:
-                            # If async iteration fails, treat as single value
-                            response_parts.append(str(response_stream))
-                        response_text = "".join(response_parts) if response_parts else str(response_stream)
-                    else:
-                        # Single response value
-                        response_text = str(response_stream)
-                        
-                except Exception as e:
-                    # If streaming fails, fallback to single response
-                    self.logger.warning(f"Streaming failed, using single response: {e}")
-                    response_text = str(response_stream) if response_stream else ""
-            else:
-                response_result = await self.response_generator.generate_with_fallback(
-                    formatted_messages,
-                    self.fallback_providers,
-                    stream=False
+                if not hasattr(response_stream, '__aiter__'):
+                    response_stream = _SingleShotAsyncIter(
+                        str(response_stream) if response_stream else ""
+                    )
+                
+                streaming_response = StreamingQueryResponse(
+                    response_stream=None,
+                    sources=search_results,
+                    conversation_id=query_request.conversation_id or uuid4()
+                )
+                streaming_response.response_stream = self._finalize_stream(
+                    streaming_response,
+                    response_stream,
+                    citation_manager,
+                    query_request.query,
+                    prompt_tokens,
+                    start_time
                 )
-                response_text = str(response_result)
+                return streaming_response
+            
+            response_result = await self.response_generator.generate_with_fallback(
+                formatted_messages,
+                self.fallback_providers,
+                stream=False,
+                hedge=settings.llm.hedge_requests,
+                hedge_delay=settings.llm.hedge_delay
+            )
+            response_text = str(response_result)
             
             # Extract citations
-            citations = self.citation_manager.get_citations(response_text)
+            citations = citation_manager.get_citations(response_text)
             
             # Create response object
-            execution_time = asyncio.get_event_loop().time() - start_time
+            execution_time = perf_counter() - start_time
             
             query_response = QueryResponse(
                 response=response_text,
                 sources=search_results,
                 conversation_id=query_request.conversation_id or uuid4(),
                 confidence=self._calculate_confidence(search_results, response_text),
-                tokens_used=self._estimate_tokens(formatted_messages, response_text),
+                tokens_used=self._estimate_tokens(prompt_tokens, response_text),
                 execution_time=execution_time
             )
             
@@ -712,6 +1015,48 @@ class SynthesisAgent(LoggerMixin):
             })
             raise
     
+    async def _finalize_stream(
+        self,
+        query_response: StreamingQueryResponse,
+        response_stream: AsyncIterator[str],
+        citation_manager: CitationManager,
+        query: str,
+        prompt_tokens: int,
+        start_time: float
+    ) -> AsyncIterator[str]:
+        """Relay the stream, then fill in the response text and its metrics."""
+        response_parts = []
+        
+        async for part in _batched(response_stream):
+            response_parts.append(part)
+            yield part
+        
+        response_text = "".join(response_parts)
+        search_results = query_response.sources
+        execution_time = perf_counter() - start_time
+        
+        query_response.response = response_text
+        query_response.confidence = self._calculate_confidence(search_results, response_text)
+        query_response.tokens_used = self._estimate_tokens(prompt_tokens, response_text)
+        query_response.execution_time = execution_time
+        
+        citations = citation_manager.get_citations(response_text)
+        
+        self.logger.info(
+            "Streamed response completed",
+            query=query,
+            response_length=len(response_text),
+            num_citations=len(citations),
+            execution_time=execution_time
+        )
+        
+        log_performance(
+            operation="response_generation",
+            duration=execution_time,
+            tokens_used=query_response.tokens_used,
+            num_sources=len(search_results)
+        )
+    
     async def save_query_response(
         self,
         query_request: QueryRequest,
@@ -726,7 +1071,7 @@ class SynthesisAgent(LoggerMixin):
                 conversation_id=query_response.conversation_id,
                 query_text=query_request.query,
                 response_text=query_response.response,
-                search_results=[result.dict() for result in query_response.sources],
+                search_results=[result.model_dump(mode='json') for result in query_response.sources],
                 confidence=query_response.confidence,
                 tokens_used=query_response.tokens_used,
                 execution_time=query_response.execution_time,
@@ -771,13 +1116,11 @@ class SynthesisAgent(LoggerMixin):
     
     def _estimate_tokens(
         self,
-        messages: List[ChatMessage],
+        prompt_tokens: int,
         response: str
     ) -> int:
-        """Estimate token usage (simple approximation)."""
-        # Simple estimation: ~4 characters per token
-        total_chars = sum(len(msg.content) for msg in messages) + len(response)
-        return total_chars // 4
+        """Estimate token usage from the prompt count and the response text."""
+        return prompt_tokens + _count_tokens(response)
     
     async def summarize_document(
         self,
@@ -793,7 +1136,9 @@ class SynthesisAgent(LoggerMixin):
                 ),
                 ChatMessage(
                     role="user",
-                    content=PromptTemplate.SUMMARY_PROMPT.format(text=content[:4000])
+                    content=PromptTemplate.SUMMARY_PROMPT.format(
+                        text=_truncate_to_tokens(content, SUMMARY_INPUT_TOKENS)
+                    )
                 )
             ]
             
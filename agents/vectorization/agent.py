@@ -4,9 +4,17 @@ Handles text chunking, embedding generation, and vector database storage.
 """
 
 import asyncio
+import hashlib
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
+from weakref import WeakKeyDictionary
+
+import numpy as np
 
 # Imports conditionnels pour les fournisseurs (OpenAI supprimé)
 try:
@@ -19,17 +27,90 @@ try:
 except ImportError:
     SentenceTransformer = None
 
+try:
+    from lingua import IsoCode639_1, LanguageDetectorBuilder
+except ImportError:
+    IsoCode639_1 = LanguageDetectorBuilder = None
+
 try:
     from langdetect import detect as detect_language
 except ImportError:
     detect_language = None
 
+try:
+    import torch
+except ImportError:
+    torch = None
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.config import settings
 from core.exceptions import EmbeddingError, ErrorCodes
+from core.http import get_shared_client
 from core.logging import LoggerMixin, log_agent_action, log_error
 from core.models import Document, DocumentChunk
-from core.providers import SothemaAIProvider
+from core.providers.sothemaai_client import SothemaAIClient, SothemaAIConfig
+
+# Embeddings travel to storage and the embedding cache as float16, half the
+# memory of float32; the vector stores upcast to float32 on upload
+EMBEDDING_DTYPE = np.float16
+
+
+def _as_embedding_matrix(embeddings: Any) -> np.ndarray:
+    """Pack provider output into an (n, dim) EMBEDDING_DTYPE matrix."""
+    return np.asarray(embeddings, dtype=EMBEDDING_DTYPE)
+
+
+# Language detection accuracy plateaus well before this many characters
+LANGUAGE_SAMPLE_CHARS = 512
+
+
+_LANGUAGE_DETECTOR_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _build_language_detector():
+    """Build the lingua detector for the configured languages, loading their models."""
+    languages = [
+        getattr(IsoCode639_1, code.upper())
+        for code in settings.processing.detection_languages
+    ]
+    return (
+        LanguageDetectorBuilder.from_iso_codes_639_1(*languages)
+        .with_preloaded_language_models()
+        .build()
+    )
+
+
+def _get_language_detector():
+    """Return the lingua detector, building it once even under concurrent callers.
+    
+    The first call takes a while; call it from an executor thread.
+    """
+    with _LANGUAGE_DETECTOR_LOCK:
+        return _build_language_detector()
+
+
+# Local model inference: one encode at a time on CPU (torch already uses every
+# core per call), a few on GPU. Created lazily on first use; asyncio primitives
+# belong to one event loop (Celery runs each task in a fresh asyncio.run), so
+# the semaphore is kept per loop.
+_EMBED_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EMBED_LIMIT = 1
+_EMBED_SEMAPHORES: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+
+def _get_embed_slots() -> Tuple[ThreadPoolExecutor, asyncio.Semaphore]:
+    """Return the executor and the running loop's semaphore that bound local encode calls."""
+    global _EMBED_EXECUTOR, _EMBED_LIMIT
+    if _EMBED_EXECUTOR is None:
+        _EMBED_LIMIT = 4 if torch is not None and torch.cuda.is_available() else 1
+        _EMBED_EXECUTOR = ThreadPoolExecutor(max_workers=_EMBED_LIMIT, thread_name_prefix="embed")
+    
+    loop = asyncio.get_running_loop()
+    semaphore = _EMBED_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _EMBED_SEMAPHORES[loop] = asyncio.Semaphore(_EMBED_LIMIT)
+    return _EMBED_EXECUTOR, semaphore
 
 
 class TextChunker:
@@ -88,25 +169,32 @@ class TextChunker:
         # First split by paragraphs
         paragraphs = text.split('\n\n')
         chunks = []
-        current_chunk = ""
+        # Paragraphs of the chunk being built and its length once joined with "\n\n" separators
+        current_parts: List[str] = []
+        current_len = 0
         
         for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) <= self.chunk_size:
-                current_chunk += paragraph + "\n\n"
+            if current_len + len(paragraph) <= self.chunk_size:
+                current_parts.append(paragraph)
+                current_len += len(paragraph) + 2
             else:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
+                current_chunk = "\n\n".join(current_parts).strip()
+                if current_chunk:
+                    chunks.append(current_chunk)
                 
                 # If paragraph is too long, split it further
                 if len(paragraph) > self.chunk_size:
                     paragraph_chunks = self.chunk_text(paragraph)
                     chunks.extend(paragraph_chunks)
-                    current_chunk = ""
+                    current_parts = []
+                    current_len = 0
                 else:
-                    current_chunk = paragraph + "\n\n"
+                    current_parts = [paragraph]
+                    current_len = len(paragraph) + 2
         
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        current_chunk = "\n\n".join(current_parts).strip()
+        if current_chunk:
+            chunks.append(current_chunk)
         
         return chunks
 
@@ -115,8 +203,8 @@ class EmbeddingProvider(ABC):
     """Abstract base class for embedding providers."""
     
     @abstractmethod
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts."""
+    async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings for a list of texts, one EMBEDDING_DTYPE row per text."""
         pass
     
     @property
@@ -139,24 +227,32 @@ class SothemaAIEmbeddingProvider(EmbeddingProvider):
         self.base_url = base_url
         self.api_key = api_key
         self._dimension = 1536  # Standard embedding dimension
-        
-        from core.models import LLMConfig
-        config = LLMConfig(
-            model="default",
-            provider="sothemaai",
-            sothemaai_base_url=base_url,
-            sothemaai_api_key=api_key
-        )
-        self.provider = SothemaAIProvider(config)
+        self.config = SothemaAIConfig(base_url=base_url, api_key=api_key)
+        self._client: Optional[SothemaAIClient] = None
+        self._client_lock = asyncio.Lock()
+    
+    async def _get_client(self) -> SothemaAIClient:
+        """Open the client session once and keep its connections alive across calls."""
+        if self._client is None:
+            # Concurrent first calls would each open (and leak) a session
+            async with self._client_lock:
+                if self._client is None:
+                    client = SothemaAIClient(self.config)
+                    await client.__aenter__()
+                    self._client = client
+        return self._client
     
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using SothemaAI API."""
+    async def close(self) -> None:
+        """Close the persistent client session."""
+        if self._client is not None:
+            await self._client.__aexit__(None, None, None)
+            self._client = None
+    
+    async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate embeddings using SothemaAI API (one request per batch)."""
         try:
-            embeddings = []
-            for text in texts:
-                embedding = await self.provider.generate_embedding(text)
-                embeddings.append(embedding)
-            return embeddings
+            client = await self._get_client()
+            return _as_embedding_matrix(await client.generate_embeddings(texts))
         except Exception as e:
             raise EmbeddingError(
                 f"Failed to generate SothemaAI embeddings: {str(e)}",
@@ -180,10 +276,13 @@ class CohereEmbeddingProvider(EmbeddingProvider):
             raise ImportError("Cohere library not available")
         
         self.model = model
-        self.client = cohere.AsyncClient(api_key=api_key or settings.llm.cohere_api_key)
+        self.client = cohere.AsyncClient(
+            api_key=api_key or settings.llm.cohere_api_key,
+            httpx_client=get_shared_client()
+        )
         self._dimension = 1024  # Cohere embedding dimension
     
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings using Cohere API."""
         try:
             response = await self.client.embed(
@@ -191,7 +290,7 @@ class CohereEmbeddingProvider(EmbeddingProvider):
                 model=self.model,
                 input_type="search_document"
             )
-            return response.embeddings
+            return _as_embedding_matrix(response.embeddings)
         except Exception as e:
             raise EmbeddingError(
                 f"Failed to generate Cohere embeddings: {str(e)}",
@@ -210,25 +309,49 @@ class CohereEmbeddingProvider(EmbeddingProvider):
 class SentenceTransformerProvider(EmbeddingProvider):
     """Local sentence transformer embedding provider."""
     
-    def __init__(self, model: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model: str = "all-MiniLM-L6-v2",
+        batch_size: int = 64,
+        half_precision: bool = True,
+        max_seq_length: Optional[int] = None,
+        normalize: bool = False
+    ):
         if not SentenceTransformer:
             raise ImportError("SentenceTransformers library not available")
         
         self.model_name_str = model
         self.model = SentenceTransformer(model)
         self._dimension = self.model.get_sentence_embedding_dimension()
+        
+        # FP16 only pays off on GPU; CPU kernels stay in FP32
+        if half_precision and self.model.device.type == "cuda":
+            self.model.half()
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+        
+        self.batch_size = batch_size
+        self.normalize = normalize
     
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def generate_embeddings(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings using local model."""
         try:
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            embeddings = await loop.run_in_executor(
-                None,
-                self.model.encode,
-                texts
-            )
-            return embeddings.tolist()
+            # Run in a dedicated pool so concurrent documents don't oversubscribe torch threads
+            executor, semaphore = _get_embed_slots()
+            async with semaphore:
+                embeddings = await asyncio.get_running_loop().run_in_executor(
+                    executor,
+                    partial(
+                        self.model.encode,
+                        texts,
+                        batch_size=self.batch_size,
+                        convert_to_numpy=True,
+                        normalize_embeddings=self.normalize,
+                        show_progress_bar=False
+                    )
+                )
+            # Keep the (n, dim) matrix; rows flow to storage unboxed
+            return _as_embedding_matrix(embeddings)
         except Exception as e:
             raise EmbeddingError(
                 f"Failed to generate SentenceTransformer embeddings: {str(e)}",
@@ -254,6 +377,10 @@ class VectorizationAgent(LoggerMixin):
         )
         self.embedding_providers = self._initialize_providers()
         self.default_provider = self._get_default_provider()
+        
+        # LRU of (model name, sha256 of chunk text) -> embedding
+        self._embedding_cache: "OrderedDict[Tuple[str, bytes], Any]" = OrderedDict()
+        self._embedding_cache_size = settings.processing.embedding_cache_size
     
     def _initialize_providers(self) -> Dict[str, EmbeddingProvider]:
         """Initialize available embedding providers."""
@@ -284,7 +411,12 @@ class VectorizationAgent(LoggerMixin):
         # Local sentence transformer
         if SentenceTransformer:
             try:
-                providers["sentence-transformer"] = SentenceTransformerProvider()
+                providers["sentence-transformer"] = SentenceTransformerProvider(
+                    batch_size=settings.processing.embedding_batch_size,
+                    half_precision=settings.processing.embedding_half_precision,
+                    max_seq_length=settings.processing.embedding_max_seq_length,
+                    normalize=settings.vector_db.normalize_embeddings
+                )
                 self.logger.info("SentenceTransformer provider initialized successfully")
             except Exception as e:
                 self.logger.warning(f"Failed to initialize SentenceTransformer provider: {str(e)}")
@@ -323,18 +455,30 @@ class VectorizationAgent(LoggerMixin):
         )
     
     def _detect_language(self, text: str) -> Optional[str]:
-        """Detect language of the text."""
+        """Detect language of the text as an ISO 639-1 code."""
+        sample = text[:LANGUAGE_SAMPLE_CHARS]
+        
+        if LanguageDetectorBuilder is not None:
+            language = _get_language_detector().detect_language_of(sample)
+            return language.iso_code_639_1.name.lower() if language else None
+        
         if not detect_language:
             return None
         
         try:
-            return detect_language(text)
+            return detect_language(sample)
         except:
             return None
     
-    def _select_optimal_provider(self, text: str, metadata: Dict[str, Any]) -> EmbeddingProvider:
+    def _select_optimal_provider(
+        self,
+        text: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        language: Optional[str] = None
+    ) -> EmbeddingProvider:
         """Select the optimal embedding provider based on text characteristics."""
-        language = self._detect_language(text)
+        if language is None:
+            language = self._detect_language(text)
         
         # Language-specific provider selection
         if language and language != 'en':
@@ -347,6 +491,44 @@ class VectorizationAgent(LoggerMixin):
         # Default to configured provider
         return self.default_provider
     
+    async def close(self) -> None:
+        """Release provider connections."""
+        for provider in self.embedding_providers.values():
+            if isinstance(provider, SothemaAIEmbeddingProvider):
+                await provider.close()
+    
+    async def _generate_embeddings_cached(
+        self,
+        provider: EmbeddingProvider,
+        texts: List[str]
+    ) -> List[Any]:
+        """Generate embeddings, only sending texts not already cached for this model."""
+        cache = self._embedding_cache
+        model = provider.model_name
+        keys = [(model, hashlib.sha256(text.encode()).digest()) for text in texts]
+        
+        embeddings = []
+        misses = []
+        for i, key in enumerate(keys):
+            embedding = cache.get(key)
+            if embedding is None:
+                misses.append(i)
+            else:
+                cache.move_to_end(key)
+            embeddings.append(embedding)
+        
+        if misses:
+            fresh = await provider.generate_embeddings([texts[i] for i in misses])
+            for i, embedding in zip(misses, fresh):
+                embeddings[i] = embedding
+                # Rows are views into the batch matrix; a copy lets the batch be freed
+                cache[keys[i]] = embedding.copy()
+            
+            while len(cache) > self._embedding_cache_size:
+                cache.popitem(last=False)
+        
+        return embeddings
+    
     async def vectorize_document(
         self,
         document: Document,
@@ -370,49 +552,63 @@ class VectorizationAgent(LoggerMixin):
             
             # Choose chunking strategy
             if use_semantic_chunking:
-                chunks_text = self.chunker.semantic_chunk_text(
-                    document.content,
-                    document.metadata.dict()
-                )
+                chunks_text = self.chunker.semantic_chunk_text(document.content)
             else:
-                chunks_text = self.chunker.chunk_text(
-                    document.content,
-                    document.metadata.dict()
-                )
+                chunks_text = self.chunker.chunk_text(document.content)
+            
+            # Detect language once; it drives provider choice and every chunk's metadata.
+            # Off the event loop: the first call builds the detector.
+            doc_language = await asyncio.get_running_loop().run_in_executor(
+                None, self._detect_language, document.content
+            )
             
             # Select optimal embedding provider
             provider = self._select_optimal_provider(
                 document.content,
-                document.metadata.dict()
+                language=doc_language
             )
             
-            # Generate embeddings in batches
+            # Embed in batches of similar-length chunks to minimize padding. Building
+            # the DocumentChunk objects for one batch overlaps the next batch's request.
             batch_size = 100
-            all_embeddings = []
+            order = sorted(range(len(chunks_text)), key=lambda i: len(chunks_text[i]))
+            document_chunks: List[Optional[DocumentChunk]] = [None] * len(chunks_text)
+            embedded_batches: asyncio.Queue = asyncio.Queue(maxsize=2)
             
-            for i in range(0, len(chunks_text), batch_size):
-                batch = chunks_text[i:i + batch_size]
-                embeddings = await provider.generate_embeddings(batch)
-                all_embeddings.extend(embeddings)
+            async def embed_batches() -> None:
+                for i in range(0, len(order), batch_size):
+                    batch_order = order[i:i + batch_size]
+                    batch = [chunks_text[j] for j in batch_order]
+                    embeddings = await self._generate_embeddings_cached(provider, batch)
+                    await embedded_batches.put((batch_order, embeddings))
+                await embedded_batches.put(None)
             
-            # Create DocumentChunk objects
-            document_chunks = []
+            async def build_chunks() -> None:
+                chunk_metadata = {
+                    "embedding_model": provider.model_name,
+                    "embedding_dimension": provider.dimension,
+                    "language": doc_language,
+                    "chunking_strategy": "semantic" if use_semantic_chunking else "fixed"
+                }
+                while (item := await embedded_batches.get()) is not None:
+                    batch_order, embeddings = item
+                    for j, embedding in zip(batch_order, embeddings):
+                        chunk_text = chunks_text[j]
+                        document_chunks[j] = DocumentChunk(
+                            document_id=document.id,
+                            content=chunk_text,
+                            chunk_index=j,
+                            embedding=embedding,
+                            metadata={**chunk_metadata, "chunk_length": len(chunk_text)}
+                        )
             
-            for i, (chunk_text, embedding) in enumerate(zip(chunks_text, all_embeddings)):
-                chunk = DocumentChunk(
-                    document_id=document.id,
-                    content=chunk_text,
-                    chunk_index=i,
-                    embedding=embedding,
-                    metadata={
-                        "embedding_model": provider.model_name,
-                        "embedding_dimension": provider.dimension,
-                        "language": self._detect_language(chunk_text),
-                        "chunk_length": len(chunk_text),
-                        "chunking_strategy": "semantic" if use_semantic_chunking else "fixed"
-                    }
-                )
-                document_chunks.append(chunk)
+            try:
+                async with asyncio.TaskGroup() as task_group:
+                    task_group.create_task(embed_batches())
+                    task_group.create_task(build_chunks())
+            except ExceptionGroup as eg:
+                # Surface the stage's own error (e.g. EmbeddingError) to callers
+                raise eg.exceptions[0]
             
             self.logger.info(
                 "Document vectorized successfully",
@@ -430,12 +626,12 @@ class VectorizationAgent(LoggerMixin):
             })
             raise
     
-    async def vectorize_batch(
+    async def iter_vectorize_batch(
         self,
         documents: List[Document],
         max_workers: int = 4
-    ) -> Dict[UUID, List[DocumentChunk]]:
-        """Vectorize multiple documents concurrently."""
+    ) -> AsyncIterator[Tuple[UUID, List[DocumentChunk]]]:
+        """Vectorize multiple documents concurrently, yielding each one as it finishes."""
         
         semaphore = asyncio.Semaphore(max_workers)
         
@@ -444,21 +640,34 @@ class VectorizationAgent(LoggerMixin):
                 chunks = await self.vectorize_document(doc)
                 return doc.id, chunks
         
-        tasks = [vectorize_single(doc) for doc in documents]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        vectorized_docs = {}
-        for result in results:
-            if isinstance(result, Exception):
-                log_error(result, {
-                    "agent": "VectorizationAgent",
-                    "operation": "batch_vectorization"
-                })
-            else:
-                doc_id, chunks = result
-                vectorized_docs[doc_id] = chunks
+        tasks = [asyncio.create_task(vectorize_single(doc)) for doc in documents]
         
-        return vectorized_docs
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    yield await next_done
+                except Exception as e:
+                    log_error(e, {
+                        "agent": "VectorizationAgent",
+                        "operation": "batch_vectorization"
+                    })
+        finally:
+            # Consumer stopped early: don't leave documents embedding in the background
+            for task in tasks:
+                task.cancel()
+            # Reap them so no failure or cancellation goes unretrieved
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def vectorize_batch(
+        self,
+        documents: List[Document],
+        max_workers: int = 4
+    ) -> Dict[UUID, List[DocumentChunk]]:
+        """Vectorize multiple documents concurrently."""
+        return {
+            doc_id: chunks
+            async for doc_id, chunks in self.iter_vectorize_batch(documents, max_workers)
+        }
     
     async def re_vectorize_document(
         self,
@@ -17,6 +17,7 @@ from datetime import datetime
 from core.config import get_app_settings
 from core.logging import get_logger
 from core.exceptions import ValidationError, ProcessingError
+from core.http import close_shared_client
 
 # Get settings instance
 settings = get_app_settings()
@@ -217,6 +218,26 @@ async def lifespan(app: FastAPI):
             await app.state.db_manager.close()
         except Exception as e:
             logger.error(f"Erreur fermeture DB: {e}")
+    
+    # Fermeture des clients des bases vectorielles
+    if getattr(app.state, 'storage_agent', None):
+        try:
+            await app.state.storage_agent.close()
+        except Exception as e:
+            logger.error(f"Erreur fermeture bases vectorielles: {e}")
+    
+    # Fermeture des connexions des fournisseurs d'embeddings
+    if getattr(app.state, 'vectorization_agent', None):
+        try:
+            await app.state.vectorization_agent.close()
+        except Exception as e:
+            logger.error(f"Erreur fermeture fournisseurs d'embeddings: {e}")
+    
+    # Fermeture du pool HTTP partagé des fournisseurs LLM
+    try:
+        await close_shared_client()
+    except Exception as e:
+        logger.error(f"Erreur fermeture client HTTP: {e}")
 
 
 # Créer l'application FastAPI
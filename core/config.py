@@ -45,9 +45,21 @@ class VectorDBSettings(BaseSettings):
     qdrant_port: int = Field(default=6333)
     qdrant_api_key: Optional[str] = Field(default=None)
     qdrant_collection_name: str = Field(default="documents")
+    qdrant_grpc_port: int = Field(default=6334)
+    qdrant_prefer_grpc: bool = Field(default=True)
+    qdrant_timeout: int = Field(default=60)
+    qdrant_max_keepalive_connections: int = Field(default=32)
+    qdrant_max_connections: int = Field(default=64)
+    # Unit-normalize vectors client-side and index with DOT instead of COSINE
+    # (only applies to newly created collections)
+    normalize_embeddings: bool = Field(default=False)
+    # int8 scalar quantization for new Qdrant collections; originals on disk
+    qdrant_quantization: bool = Field(default=True)
+    qdrant_quantization_oversampling: float = Field(default=2.0)
     
     # Weaviate settings
     weaviate_url: str = Field(default="http://localhost:8080")
+    weaviate_grpc_port: int = Field(default=50051)
     weaviate_api_key: Optional[str] = Field(default=None)
     weaviate_class_name: str = Field(default="Document")
     
@@ -78,6 +90,8 @@ class LLMSettings(BaseSettings):
     # Ollama settings
     ollama_base_url: str = Field(default="http://localhost:11434")
     ollama_model: str = Field(default="llama3:8b")
+    # Seconds; None leaves Ollama requests unbounded
+    ollama_timeout: Optional[float] = Field(default=None)
     
     # Embedding settings
     embedding_model: str = Field(default="all-MiniLM-L6-v2")
@@ -99,6 +113,10 @@ class LLMSettings(BaseSettings):
     sothemaai_api_key: Optional[str] = Field(default=None)
     sothemaai_timeout: int = Field(default=30)
     
+    # Hedged fallback for non-streaming requests (costs duplicate calls)
+    hedge_requests: bool = Field(default=False)
+    hedge_delay: float = Field(default=0.5)
+    
     model_config = {
         "env_prefix": "LLM_",
         "case_sensitive": False
@@ -170,6 +188,38 @@ class ProcessingSettings(BaseSettings):
     chunk_size: int = Field(default=1000)
     chunk_overlap: int = Field(default=200)
     
+    # Local embedding model
+    embedding_batch_size: int = Field(default=64)
+    embedding_half_precision: bool = Field(default=True)
+    embedding_max_seq_length: Optional[int] = Field(default=None)
+    embedding_cache_size: int = Field(default=10000)
+    
+    # Language detection (ISO 639-1 codes the detector chooses between)
+    detection_languages: List[str] = Field(default=["en", "fr", "ar", "es", "de"])
+    
+    @field_validator("detection_languages", mode="before")
+    @classmethod
+    def validate_detection_languages(cls, v):
+        if isinstance(v, str):
+            v = v.split(",")
+        codes = list(dict.fromkeys(code.strip().lower() for code in v))
+        
+        try:
+            from lingua import IsoCode639_1
+        except ImportError:
+            IsoCode639_1 = None
+        
+        invalid = [
+            code for code in codes
+            if len(code) != 2 or not code.isalpha()
+            or (IsoCode639_1 is not None and not hasattr(IsoCode639_1, code.upper()))
+        ]
+        if invalid:
+            raise ValueError(f"Unsupported ISO 639-1 language codes: {invalid}")
+        if len(codes) < 2:
+            raise ValueError("Language detection needs at least two languages")
+        return codes
+    
     # Audio processing
     whisper_model: str = Field(default="tiny")
     audio_sample_rate: int = Field(default=16000)
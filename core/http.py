@@ -0,0 +1,68 @@
+"""
+Shared HTTP connection pool for the Enterprise RAG System.
+"""
+
+import asyncio
+from importlib.util import find_spec
+from typing import Optional
+
+import httpx
+
+HTTP_LIMITS = httpx.Limits(
+    max_connections=64,
+    max_keepalive_connections=32,
+    keepalive_expiry=30
+)
+HTTP_TIMEOUT = httpx.Timeout(300.0)
+
+# HTTP/2 multiplexing needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = find_spec("h2") is not None
+
+_shared_client: Optional[httpx.AsyncClient] = None
+_shared_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the running event loop, or None outside of one."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Return the HTTP client for the running event loop, creating it if needed.
+    
+    Pooled connections belong to the loop that opened them, so a client left
+    over from another loop (e.g. a finished asyncio.run in a Celery worker) is
+    replaced rather than reused.
+    """
+    global _shared_client, _shared_client_loop
+    loop = _get_running_loop()
+    
+    if _shared_client is not None and not _shared_client.is_closed:
+        if _shared_client_loop is None:
+            _shared_client_loop = loop
+        if _shared_client_loop is loop or (loop is None and not _shared_client_loop.is_closed()):
+            return _shared_client
+    
+    _shared_client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=HTTP_LIMITS,
+        timeout=HTTP_TIMEOUT
+    )
+    _shared_client_loop = loop
+    return _shared_client
+
+
+async def close_shared_client() -> None:
+    """Close the HTTP client of the running event loop."""
+    global _shared_client, _shared_client_loop
+    if (
+        _shared_client is not None
+        and not _shared_client.is_closed
+        and _shared_client_loop in (None, _get_running_loop())
+    ):
+        await _shared_client.aclose()
+    _shared_client = None
+    _shared_client_loop = None
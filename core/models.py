@@ -7,6 +7,7 @@ from enum import Enum
 from typing import Any, Dict, List, Optional, Union
 from uuid import UUID, uuid4
 
+import numpy as np
 from pydantic import BaseModel, Field, validator
 
 
@@ -104,9 +105,14 @@ class DocumentChunk(UUIDModel, TimestampedModel):
     chunk_index: int
     start_char: Optional[int] = None
     end_char: Optional[int] = None
-    embedding: Optional[List[float]] = None
+    # float32 ndarray rows straight from the embedding provider are kept as-is
+    embedding: Optional[Union[np.ndarray, List[float]]] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
+    model_config = {
+        "arbitrary_types_allowed": True
+    }
+
 
 class Document(UUIDModel, TimestampedModel):
     """Document model."""
@@ -207,6 +213,22 @@ class QueryResponse(BaseModel):
     execution_time: float
 
 
+class StreamingQueryResponse(BaseModel):
+    """Query response whose text is delivered as a stream.
+    
+    response, confidence, tokens_used and execution_time are filled in once
+    response_stream has been consumed.
+    """
+    response_stream: Any = Field(exclude=True)  # AsyncIterator[str]
+    sources: List[SearchResult] = Field(default_factory=list)
+    conversation_id: UUID
+    message_id: UUID = Field(default_factory=uuid4)
+    response: Optional[str] = None
+    confidence: Optional[float] = None
+    tokens_used: Optional[int] = None
+    execution_time: Optional[float] = None
+
+
 # User and permission models
 class UserRole(str, Enum):
     """User roles."""
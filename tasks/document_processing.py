@@ -15,6 +15,7 @@ from agents.vectorization.agent import VectorizationAgent
 from agents.storage.agent import StorageAgent
 from core.celery import celery_app
 from core.exceptions import DocumentProcessingError
+from core.http import close_shared_client
 from core.logging import log_agent_action, log_error
 from core.models import Document, DocumentStatus
 from database.manager import DatabaseManager
@@ -27,7 +28,14 @@ class AsyncTask(Task):
     
     def run(self, *args, **kwargs):
         """Wrapper to run async functions in Celery."""
-        return asyncio.run(self.async_run(*args, **kwargs))
+        return asyncio.run(self._run_in_loop(*args, **kwargs))
+    
+    async def _run_in_loop(self, *args, **kwargs):
+        """Run the task, then release HTTP connections bound to this task's loop."""
+        try:
+            return await self.async_run(*args, **kwargs)
+        finally:
+            await close_shared_client()
     
     async def async_run(self, *args, **kwargs):
         """Override this method in subclasses."""
@@ -38,6 +46,9 @@ class AsyncTask(Task):
 async def process_document_task(self, document_id: str, processing_options: Optional[Dict] = None):
     """Traite un document de bout en bout."""
     
+    vectorization_agent = None
+    storage_agent = None
+    
     try:
         doc_uuid = UUID(document_id)
         db_manager = DatabaseManager()
@@ -125,6 +136,12 @@ async def process_document_task(self, document_id: str, processing_options: Opti
             f"Document processing failed after {self.max_retries} retries: {str(e)}",
             error_code="PROCESSING_FAILED"
         )
+    
+    finally:
+        if vectorization_agent is not None:
+            await vectorization_agent.close()
+        if storage_agent is not None:
+            await storage_agent.close()
 
 
 @celery_app.task(bind=True, base=AsyncTask)
@@ -227,6 +244,9 @@ async def reprocess_failed_documents_task(self, max_documents: int = 50):
 async def update_document_embeddings_task(self, document_id: str, new_model: str):
     """Met à jour les embeddings d'un document avec un nouveau modèle."""
     
+    vectorization_agent = None
+    storage_agent = None
+    
     try:
         doc_uuid = UUID(document_id)
         db_manager = DatabaseManager()
@@ -285,6 +305,12 @@ async def update_document_embeddings_task(self, document_id: str, new_model: str
             "task_id": self.request.id
         })
         raise
+    
+    finally:
+        if vectorization_agent is not None:
+            await vectorization_agent.close()
+        if storage_agent is not None:
+            await storage_agent.close()
 
 
 # Fonctions utilitaires
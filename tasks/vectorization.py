@@ -11,6 +11,7 @@ from celery import Task
 
 from agents.vectorization.agent import VectorizationAgent
 from core.celery import celery_app
+from core.http import close_shared_client
 from core.logging import log_agent_action, log_error
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,14 @@ class AsyncTask(Task):
     """Base class for async Celery tasks."""
     
     def run(self, *args, **kwargs):
-        return asyncio.run(self.async_run(*args, **kwargs))
+        return asyncio.run(self._run_in_loop(*args, **kwargs))
+    
+    async def _run_in_loop(self, *args, **kwargs):
+        """Run the task, then release HTTP connections bound to this task's loop."""
+        try:
+            return await self.async_run(*args, **kwargs)
+        finally:
+            await close_shared_client()
     
     async def async_run(self, *args, **kwargs):
         raise NotImplementedError
@@ -30,6 +38,8 @@ class AsyncTask(Task):
 async def rebuild_vector_index_task(self, collection_name: str, batch_size: int = 1000):
     """Reconstruit l'index vectoriel pour une collection."""
     
+    vectorization_agent = None
+    
     try:
         vectorization_agent = VectorizationAgent()
         
@@ -60,6 +70,10 @@ async def rebuild_vector_index_task(self, collection_name: str, batch_size: int
             "task_id": self.request.id
         })
         raise
+    
+    finally:
+        if vectorization_agent is not None:
+            await vectorization_agent.close()
 
 
 @celery_app.task(bind=True, base=AsyncTask)
@@ -0,0 +1,48 @@
+"""
+Tests unitaires pour la configuration du logging structuré.
+"""
+
+import logging
+
+import pytest
+import structlog
+from structlog.testing import capture_logs
+
+from core.logging import log_agent_action
+
+
+class TestAgentActionLogging:
+    """Tests pour le filtrage de niveau de log_agent_action."""
+
+    @pytest.fixture(autouse=True)
+    def reset_structlog(self):
+        """Restaurer la configuration structlog par défaut."""
+        structlog.reset_defaults()
+        yield
+        structlog.reset_defaults()
+
+    def test_agent_action_emitted_by_default(self):
+        """Test qu'une action d'agent INFO est émise sans configuration explicite."""
+
+        with capture_logs() as logs:
+            log_agent_action("StorageAgent", "store_chunks", num_chunks=3)
+
+        assert logs == [{
+            "event": "Agent action",
+            "log_level": "info",
+            "agent": "StorageAgent",
+            "action": "store_chunks",
+            "num_chunks": 3,
+        }]
+
+    def test_agent_action_filtered_above_info(self):
+        """Test que les actions d'agent sont filtrées si le niveau est WARNING."""
+
+        structlog.configure(
+            wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING)
+        )
+
+        with capture_logs() as logs:
+            log_agent_action("StorageAgent", "store_chunks", num_chunks=3)
+
+        assert logs == []
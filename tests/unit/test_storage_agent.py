@@ -0,0 +1,103 @@
+"""
+Tests unitaires pour l'agent de stockage.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from agents.storage.agent import StorageAgent
+from core.exceptions import VectorDBError
+from core.models import DocumentChunk
+
+
+class PartialFailureVectorDB:
+    """Base vectorielle factice dont un lot échoue après une écriture partielle."""
+
+    def __init__(self, failing_batch: int):
+        self.failing_batch = failing_batch
+        self.batches = 0
+        self.written_ids = []
+        self.deleted_ids = []
+
+    async def insert_vectors(self, collection_name, chunks):
+        self.batches += 1
+        if self.batches == self.failing_batch:
+            # Only the first half of the batch reaches the store
+            self.written_ids.extend(chunk.id for chunk in chunks[:len(chunks) // 2])
+            raise VectorDBError("insert failed")
+        self.written_ids.extend(chunk.id for chunk in chunks)
+        return True
+
+    async def delete_vectors(self, collection_name, chunk_ids):
+        self.deleted_ids.extend(chunk_ids)
+        return True
+
+
+def make_chunks(count: int) -> list:
+    """Créer des chunks avec embeddings."""
+    document_id = uuid4()
+    return [
+        DocumentChunk(
+            document_id=document_id,
+            content=f"Chunk {i}",
+            chunk_index=i,
+            embedding=np.ones(4, dtype=np.float32)
+        )
+        for i in range(count)
+    ]
+
+
+class TestStoreChunksRollback:
+    """Tests pour la compensation des écritures vectorielles."""
+
+    @pytest.fixture
+    def storage_agent(self):
+        """Agent de stockage sans connexion aux bases."""
+        agent = StorageAgent.__new__(StorageAgent)
+        agent.vector_databases = {}
+        agent.default_collection = "documents"
+        agent.VECTOR_BATCH_SIZE = 4
+        return agent
+
+    @pytest.fixture
+    def db_session(self):
+        """Session SQL factice."""
+        session = MagicMock()
+        session.commit = AsyncMock()
+        session.rollback = AsyncMock()
+        return session
+
+    async def test_failed_batch_discards_every_written_vector(self, storage_agent, db_session):
+        """Test que l'échec du deuxième lot supprime tous les vecteurs écrits."""
+
+        vector_db = PartialFailureVectorDB(failing_batch=2)
+        storage_agent.default_db = vector_db
+        chunks = make_chunks(10)
+
+        with patch.object(storage_agent, "_existing_chunk_ids", AsyncMock(return_value=set())), \
+             patch.object(storage_agent, "_write_sql_chunks", AsyncMock()):
+            with pytest.raises(VectorDBError):
+                await storage_agent.store_chunks(chunks, db_session)
+
+        assert len(vector_db.written_ids) == 6
+        assert set(vector_db.written_ids) <= set(vector_db.deleted_ids)
+        db_session.commit.assert_not_called()
+
+    async def test_existing_chunks_keep_their_vectors(self, storage_agent, db_session):
+        """Test que les vecteurs des chunks déjà stockés ne sont pas supprimés."""
+
+        vector_db = PartialFailureVectorDB(failing_batch=0)
+        storage_agent.default_db = vector_db
+        chunks = make_chunks(6)
+        existing_ids = {chunk.id for chunk in chunks[:2]}
+        db_session.commit.side_effect = RuntimeError("commit failed")
+
+        with patch.object(storage_agent, "_existing_chunk_ids", AsyncMock(return_value=existing_ids)), \
+             patch.object(storage_agent, "_write_sql_chunks", AsyncMock()):
+            with pytest.raises(RuntimeError):
+                await storage_agent.store_chunks(chunks, db_session)
+
+        assert set(vector_db.deleted_ids) == {chunk.id for chunk in chunks[2:]}
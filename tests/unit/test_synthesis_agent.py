@@ -0,0 +1,241 @@
+"""
+Tests unitaires pour l'agent de synthèse.
+"""
+
+import asyncio
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from structlog.testing import capture_logs
+
+from agents.synthesis.agent import LLMProvider, ResponseGenerator, SynthesisAgent, _batched
+from core.exceptions import ErrorCodes, LLMError
+from core.models import ChatMessage, QueryRequest, SearchResult
+
+
+class GatedProvider(LLMProvider):
+    """Fournisseur factice qui répond une fois la porte ouverte."""
+
+    def __init__(self, response: str, gate: asyncio.Event):
+        self.response = response
+        self.gate = gate
+
+    async def generate_response(self, messages, stream=False, **kwargs):
+        await self.gate.wait()
+        return self.response
+
+
+class TimedProvider(LLMProvider):
+    """Fournisseur factice qui répond (ou échoue) après un délai."""
+
+    def __init__(self, response: str = "", delay: float = 0.0, error: Exception = None):
+        self.response = response
+        self.delay = delay
+        self.error = error
+        self.cancelled = False
+
+    async def generate_response(self, messages, stream=False, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+async def timed_stream(*parts, delay: float = 0.0):
+    """Flux factice qui produit chaque partie après un délai."""
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+
+
+async def collect(stream) -> list:
+    """Consommer un flux asynchrone dans une liste."""
+    return [part async for part in stream]
+
+
+def make_search_result() -> SearchResult:
+    """Créer un résultat de recherche minimal."""
+    return SearchResult(
+        chunk_id=uuid4(),
+        document_id=uuid4(),
+        content="Contenu du chunk",
+        score=0.9
+    )
+
+
+class TestSynthesisAgentConcurrency:
+    """Tests pour le partage d'une instance de SynthesisAgent entre requêtes."""
+
+    @pytest.fixture
+    def mock_settings(self):
+        """Paramètres LLM sans requêtes concurrentes (hedging)."""
+        with patch("agents.synthesis.agent.settings") as mock_settings:
+            mock_settings.llm.hedge_requests = False
+            yield mock_settings
+
+    async def test_concurrent_requests_keep_their_citations(self, mock_settings):
+        """Test que deux requêtes entrelacées ne mélangent pas leurs sources."""
+
+        gate = asyncio.Event()
+        agent = SynthesisAgent.__new__(SynthesisAgent)
+        agent.response_generator = ResponseGenerator(
+            GatedProvider("Réponse [Source: 1] et [Source: 2]", gate)
+        )
+        agent.fallback_providers = []
+
+        with capture_logs() as logs:
+            first = asyncio.create_task(agent.generate_response(
+                QueryRequest(query="first"), [make_search_result()]
+            ))
+            second = asyncio.create_task(agent.generate_response(
+                QueryRequest(query="second"), [make_search_result(), make_search_result()]
+            ))
+
+            # Both requests register their sources before either one completes
+            await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(first, second)
+
+        num_citations = {
+            log["query"]: log["num_citations"]
+            for log in logs
+            if log["event"] == "Response generated successfully"
+        }
+        assert num_citations == {"first": 1, "second": 2}
+
+
+class TestHedgedGeneration:
+    """Tests pour la génération concurrente (hedging) entre fournisseurs."""
+
+    @pytest.fixture
+    def messages(self):
+        """Messages de chat minimaux."""
+        return [ChatMessage(role="user", content="Question")]
+
+    async def test_fast_primary_skips_fallbacks(self, messages):
+        """Test qu'un fournisseur principal rapide ne démarre pas les secours."""
+
+        primary = TimedProvider("primary")
+        fallback = TimedProvider("fallback")
+        generator = ResponseGenerator(primary)
+
+        with patch.object(fallback, "generate_response", wraps=fallback.generate_response) as spy:
+            result = await generator.generate_with_fallback(
+                messages, [fallback], hedge=True, hedge_delay=0.1
+            )
+
+        assert result == "primary"
+        spy.assert_not_called()
+
+    async def test_losing_hedge_is_cancelled(self, messages):
+        """Test que la requête perdante est annulée dès qu'un fournisseur répond."""
+
+        primary = TimedProvider("primary", delay=10)
+        fallback = TimedProvider("fallback", delay=0.01)
+        generator = ResponseGenerator(primary)
+
+        result = await generator.generate_with_fallback(
+            messages, [fallback], hedge=True, hedge_delay=0.01
+        )
+        await asyncio.sleep(0)
+
+        assert result == "fallback"
+        assert primary.cancelled
+        assert not fallback.cancelled
+
+    async def test_failed_primary_falls_back(self, messages):
+        """Test qu'un échec du fournisseur principal bascule sur le secours."""
+
+        primary = TimedProvider(error=RuntimeError("primary down"))
+        fallback = TimedProvider("fallback")
+        generator = ResponseGenerator(primary)
+
+        result = await generator.generate_with_fallback(
+            messages, [fallback], hedge=True, hedge_delay=10
+        )
+
+        assert result == "fallback"
+
+    async def test_all_providers_failed_raises_llm_error(self, messages):
+        """Test que l'échec de tous les fournisseurs lève une LLMError."""
+
+        primary = TimedProvider(error=RuntimeError("primary down"))
+        fallback = TimedProvider(error=ValueError("fallback down"), delay=0.01)
+        generator = ResponseGenerator(primary)
+
+        with pytest.raises(LLMError) as exc_info:
+            await generator.generate_with_fallback(
+                messages, [fallback], hedge=True, hedge_delay=0.01
+            )
+
+        assert exc_info.value.error_code == ErrorCodes.LLM_REQUEST_FAILED
+        assert isinstance(exc_info.value.__cause__, ValueError)
+
+
+class TestStreamBatching:
+    """Tests pour le regroupement des fragments de flux (_batched)."""
+
+    async def test_flushes_on_size(self):
+        """Test qu'un lot est émis dès que la taille maximale est atteinte."""
+
+        stream = timed_stream(*["a" * 10] * 10)
+
+        batches = await collect(_batched(stream, max_chars=64, max_delay=10))
+
+        assert batches == ["a" * 70, "a" * 30]
+
+    async def test_flushes_on_timeout(self):
+        """Test qu'un lot partiel est émis quand le flux marque une pause."""
+
+        stream = timed_stream("x", "y", delay=0.05)
+
+        batches = await collect(_batched(stream, max_chars=64, max_delay=0.01))
+
+        assert batches == ["x", "y"]
+
+    async def test_end_of_stream_flushes_remainder(self):
+        """Test que la fin du flux émet le reste du tampon puis termine."""
+
+        stream = timed_stream("ab", "", "cd")
+
+        batches = await collect(_batched(stream, max_chars=64, max_delay=10))
+
+        assert batches == ["abcd"]
+
+    async def test_empty_stream(self):
+        """Test qu'un flux vide ne produit aucun lot."""
+
+        assert await collect(_batched(timed_stream(), max_delay=0.01)) == []
+
+    async def test_stream_error_propagates(self):
+        """Test qu'une erreur du flux source est propagée au consommateur."""
+
+        async def failing_stream():
+            yield "partial"
+            raise LLMError("stream broken", error_code=ErrorCodes.LLM_REQUEST_FAILED)
+
+        with pytest.raises(LLMError):
+            await collect(_batched(failing_stream(), max_delay=10))
+
+    async def test_closing_cancels_pending_read(self):
+        """Test que fermer le flux regroupé annule la lecture en attente."""
+
+        source = TimedProvider(delay=10)
+
+        async def slow_stream():
+            yield "first"
+            await source.generate_response([])
+            yield "never"
+
+        batched = _batched(slow_stream(), max_delay=0.01)
+        assert await batched.__anext__() == "first"
+
+        await batched.aclose()
+        await asyncio.sleep(0)
+
+        assert source.cancelled